@@ -1,5 +1,16 @@
+import time
+from http import HTTPStatus
+from typing import Any
+
+import orjson
 from django.conf import settings
-from django.http import HttpRequest, JsonResponse
+from django.db import DataError
+from django.db.models import Field, IntegerField
+from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.views.decorators.http import require_POST
+
+from experiments.models import ALL_INPUT_COLUMNS, AUTO_FILTER_STRATEGY, ExperimentBase
+from experiments.utils import MIN_KEY_COLUMNS, key_column_prefixes
 
 
 def debug(request: HttpRequest) -> JsonResponse:
@@ -9,3 +20,82 @@ def debug(request: HttpRequest) -> JsonResponse:
             "user": request.user.username,
         }
     )
+
+
+def orjson_response(data: dict, status: int = HTTPStatus.OK) -> HttpResponse:
+    return HttpResponse(orjson.dumps(data), status=status, content_type="application/json")
+
+
+def parse_filter_payload(payload: Any) -> tuple[type[ExperimentBase], list[str], list[tuple], str]:
+    """Return the table, columns, inputs and strategy of a filter request, or raise ValueError if invalid."""
+    if not isinstance(payload, dict):
+        raise ValueError("The body must be a JSON object")
+
+    experiment_tables = ExperimentBase.submodels_by_size()
+    table_size = payload.get("table_size")
+    if not isinstance(table_size, str) or table_size not in experiment_tables:
+        raise ValueError(f"table_size must be one of {list(experiment_tables)}")
+
+    # The columnar and key summary strategies are built on the prefixes of the columns
+    columns = payload.get("columns")
+    if columns not in key_column_prefixes(ALL_INPUT_COLUMNS):
+        raise ValueError(
+            f"columns must be the first {MIN_KEY_COLUMNS} to {len(ALL_INPUT_COLUMNS)} of {ALL_INPUT_COLUMNS}"
+        )
+
+    inputs = payload.get("inputs")
+    if (
+        not isinstance(inputs, list)
+        or not inputs
+        or any(not isinstance(input_tuple, list) or len(input_tuple) != len(columns) for input_tuple in inputs)
+    ):
+        raise ValueError("inputs must be a non-empty list of lists with one value per column")
+
+    # Mistyped values are otherwise only rejected by the database, with the strategies sending typed arrays
+    experiment_table = experiment_tables[table_size]
+    for position, column in enumerate(columns):
+        field = experiment_table._meta.get_field(column)
+        column_type = int if isinstance(field, IntegerField) else str
+        nullable = isinstance(field, Field) and field.null
+        if any(
+            type(input_tuple[position]) is not column_type and not (input_tuple[position] is None and nullable)
+            for input_tuple in inputs
+        ):
+            raise ValueError(f"{column} values must be of type {column_type.__name__}")
+
+    strategy = payload.get("strategy") or AUTO_FILTER_STRATEGY
+    return experiment_table, columns, [tuple(input_tuple) for input_tuple in inputs], strategy
+
+
+@require_POST
+def filter_rows(request: HttpRequest) -> HttpResponse:
+    """Return the average age of the rows of a table matching a list of input tuples.
+
+    Example body: {"table_size": "5M", "columns": ["first_name", "last_name"], "inputs": [["John", "Doe"]],
+    "strategy": "auto"}
+    """
+    try:
+        payload = orjson.loads(request.body)
+    except orjson.JSONDecodeError as error:
+        return orjson_response({"error": f"Invalid JSON: {error}"}, status=HTTPStatus.BAD_REQUEST)
+
+    start_time = time.perf_counter()
+    try:
+        experiment_table, columns, inputs, strategy = parse_filter_payload(payload)
+        average_age, strategy = experiment_table.filter_rows(inputs, columns, strategy)
+    except (ValueError, DataError) as error:
+        # DataError: a value out of the range of its column, e.g. an age above the integer range
+        return orjson_response({"error": str(error)}, status=HTTPStatus.BAD_REQUEST)
+    except FileNotFoundError:
+        # The columnar strategy reads the export of the build_columnar_index command
+        return orjson_response(
+            {"error": f"The table is not exported for the {strategy} strategy"}, status=HTTPStatus.SERVICE_UNAVAILABLE
+        )
+
+    return orjson_response(
+        {
+            "average_age": average_age,
+            "strategy": strategy,
+            "duration_ms": (time.perf_counter() - start_time) * 1000,
+        }
+    )
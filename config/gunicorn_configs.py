@@ -8,12 +8,15 @@ API_PORT = int(os.environ.get("API_PORT", "8000"))
 LONG_API_REQUEST_THRESHOLD_SECONDS = int(os.environ.get("LONG_API_REQUEST_THRESHOLD_SECONDS", "2"))
 GUNICORN_WORKERS = int(os.environ.get("GUNICORN_WORKERS", "5"))
 GUNICORN_WORKER_TIMEOUT = int(os.environ.get("GUNICORN_WORKER_TIMEOUT", "30"))
+# "sync" serves config.wsgi, an ASGI worker class serves config.asgi
+GUNICORN_WORKER_CLASS = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+ASGI_WORKER_CLASSES = ["uvicorn_worker.UvicornWorker"]
 
 # Gunicorn settings
 # https://docs.gunicorn.org/en/stable/settings.html
-wsgi_app = "config.wsgi:application"
+wsgi_app = "config.asgi:application" if GUNICORN_WORKER_CLASS in ASGI_WORKER_CLASSES else "config.wsgi:application"
 bind = f"0.0.0.0:{API_PORT}"
-worker_class = "sync"
+worker_class = GUNICORN_WORKER_CLASS
 workers = GUNICORN_WORKERS
 threads = 1
 timeout = GUNICORN_WORKER_TIMEOUT
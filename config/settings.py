@@ -1,5 +1,6 @@
 import os
 from pathlib import Path
+from typing import Any
 
 from config.redis import REDIS_DJANGO_DB, REDIS_HOST, REDIS_PORT
 
@@ -120,7 +121,7 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 # https://docs.djangoproject.com/en/stable/ref/settings/#databases
 # Pool documentation: https://www.psycopg.org/psycopg3/docs/api/pool.html#psycopg_pool.ConnectionPool
 DEFAULT_DB = "default"
-DATABASES = {
+DATABASES: dict[str, dict[str, Any]] = {
     DEFAULT_DB: {
         "ENGINE": "django.db.backends.postgresql",
         "NAME": os.environ.get("EXPERIMENTS_DB_NAME", "experimentsdb"),
@@ -131,6 +132,40 @@ DATABASES = {
     },
 }
 
+# Connection profile of the default DB:
+# - direct: a new connection per request, with client-side binding and no prepared statements (Django default)
+# - pooled: connections reused from a psycopg pool, with server-side binding and prepared statements
+DB_CONNECTION_PROFILES = ["direct", "pooled"]
+DB_CONNECTION_PROFILE = os.environ.get("EXPERIMENTS_DB_CONNECTION_PROFILE", "direct")
+if DB_CONNECTION_PROFILE not in DB_CONNECTION_PROFILES:
+    raise ValueError(f"Unknown DB connection profile: {DB_CONNECTION_PROFILE}. Available: {DB_CONNECTION_PROFILES}")
+POOLED_DB_OPTIONS = {
+    "pool": {
+        "min_size": int(os.environ.get("EXPERIMENTS_DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.environ.get("EXPERIMENTS_DB_POOL_MAX_SIZE", "10")),
+    },
+    # Queries are prepared on the server after being executed this number of times on a connection
+    "prepare_threshold": int(os.environ.get("EXPERIMENTS_DB_PREPARE_THRESHOLD", "5")),
+    # Only server-side binding sends queries that can be prepared
+    "server_side_binding": True,
+}
+if DB_CONNECTION_PROFILE == "pooled":
+    DATABASES[DEFAULT_DB]["OPTIONS"] = POOLED_DB_OPTIONS
+
+# Number of hash partitions of the partitioned experiment table, read when its migration creates it
+EXPERIMENTS_PARTITION_COUNT = int(os.environ.get("EXPERIMENTS_PARTITION_COUNT", "16"))
+
+# Bloom filters of the key tuples of the experiment tables, memory-mapped from this directory
+BLOOM_FILTER_DIR = Path(os.environ.get("EXPERIMENTS_BLOOM_FILTER_DIR", "bloom_filters"))
+# False positive rate of a full table, the filters are sized for the maximum number of rows of the table
+BLOOM_FILTER_FALSE_POSITIVE_RATE = float(os.environ.get("EXPERIMENTS_BLOOM_FILTER_FALSE_POSITIVE_RATE", "0.01"))
+
+# Memory-mapped columns of the experiment tables, exported by the build_columnar_index command
+COLUMNAR_INDEX_DIR = Path(os.environ.get("EXPERIMENTS_COLUMNAR_INDEX_DIR", "columnar_index"))
+
+# SQLite database the experiments append their results and samples to, with the metadata of their runs
+RESULTS_STORE_PATH = Path(os.environ.get("EXPERIMENTS_RESULTS_STORE_PATH", "results.sqlite3"))
+
 # LOGGING
 # https://docs.djangoproject.com/en/stable/ref/settings/#logging
 LOGGING = {
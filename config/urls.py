@@ -24,6 +24,7 @@ from config import api
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("debug/", api.debug),
+    path("experiments/filter", api.filter_rows),
 ]
 
 if settings.ENV == "local":
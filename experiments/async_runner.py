@@ -0,0 +1,132 @@
+import asyncio
+import time
+from typing import Any, Callable
+
+import psycopg
+from django.conf import settings
+from django.db import connection
+from psycopg_pool import AsyncConnectionPool
+
+from experiments.models import ALL_INPUT_COLUMNS, ExperimentBase
+from experiments.runner import (
+    ExperimentOptions,
+    generate_inputs,
+    new_results,
+    record_samples,
+    save_results,
+    set_cache_state,
+)
+
+DEFAULT_IN_FLIGHT = 1
+
+
+def async_connection_kwargs() -> dict[str, Any]:
+    """Parameters of the Django connection for psycopg async connections, with the matching async cursor."""
+    conn_params = connection.get_connection_params()
+    cursor_factory = conn_params.pop("cursor_factory")
+    # Django uses client-side binding unless the server_side_binding option is enabled
+    is_client_cursor = issubclass(cursor_factory, psycopg.ClientCursor)
+    conn_params["cursor_factory"] = psycopg.AsyncClientCursor if is_client_cursor else psycopg.AsyncCursor
+    conn_params["autocommit"] = True
+    return conn_params
+
+
+async def open_pool(conn_kwargs: dict[str, Any], size: int) -> AsyncConnectionPool:
+    pool = AsyncConnectionPool(
+        kwargs=conn_kwargs,
+        min_size=size,
+        max_size=size,
+        open=False,
+        # Connections are closed by the database when an evict command restarts it
+        check=AsyncConnectionPool.check_connection,
+    )
+    await pool.open(wait=True)
+    return pool
+
+
+async def measure_queries(
+    pool: AsyncConnectionPool, method: Callable, input_sets: list[list[tuple]], columns: list[str]
+) -> list[float]:
+    """Run the method once per set of inputs with all queries in flight, and return the duration in ms of each."""
+
+    async def measure(inputs: list[tuple]) -> float:
+        async with pool.connection() as aconnection:
+            # Only measure the experiment method, not the wait for a connection
+            start_time = time.perf_counter()
+            await method(aconnection, inputs, columns)
+            return (time.perf_counter() - start_time) * 1000
+
+    return list(await asyncio.gather(*(measure(inputs) for inputs in input_sets)))
+
+
+def measure_async_method(  # noqa: PLR0913
+    runner: asyncio.Runner,
+    pool: AsyncConnectionPool,
+    experiment_table: type[ExperimentBase],
+    method: Callable,
+    input_size: int,
+    columns: list[str],
+    options: ExperimentOptions,
+    in_flight: int,
+) -> tuple[list[float], dict]:
+    """Return the duration in ms of each recorded run of the async method, and the cache state of the runs.
+
+    The runs are sent in waves of in_flight queries. Inputs and cache state are prepared between the waves,
+    outside of the event loop, as they rely on the sync ORM.
+    """
+    durations_ms: list[float] = []
+    cache_state: dict = {}
+    for is_warmup, number_runs in [(True, options.warmup_runs), (False, options.number_runs)]:
+        for wave_start in range(0, number_runs, in_flight):
+            wave_size = min(in_flight, number_runs - wave_start)
+            print(
+                f"Warm-up runs {wave_start + 1}-{wave_start + wave_size}/{number_runs}..."
+                if is_warmup
+                else f"Runs {wave_start + 1}-{wave_start + wave_size}/{number_runs}..."
+            )
+            input_sets = [generate_inputs(experiment_table, input_size, columns, options) for _ in range(wave_size)]
+            if not is_warmup:
+                set_cache_state(experiment_table, options, cache_state)
+
+            wave_durations_ms = runner.run(measure_queries(pool, method, input_sets, columns))
+            if not is_warmup:
+                durations_ms += wave_durations_ms
+
+    return durations_ms, cache_state
+
+
+def run_async_experiment(input_size: int, input_columns: int, options: ExperimentOptions, in_flight: int):
+    """Run the async variants of the experiment methods with up to in_flight queries at once from one process.
+
+    The results have the same shape as run_experiment, with the names of the sync methods.
+    Methods running on several connections, without async variant, are not measured.
+    EXPLAIN plans are not captured by the async runner.
+    """
+    columns = ALL_INPUT_COLUMNS[:input_columns]
+    results = new_results(input_size, columns, options)
+    results["in_flight"] = in_flight
+    experiment_methods = ExperimentBase.async_experiment_methods()
+    if options.reverse_order:
+        experiment_methods.reverse()
+
+    with asyncio.Runner() as runner:
+        pool = runner.run(open_pool(async_connection_kwargs(), in_flight))
+        try:
+            for base_async_method in experiment_methods:
+                # Recorded under the name of the sync method
+                method_name = base_async_method.__name__.removeprefix("a")
+                for experiment_table in ExperimentBase.submodels_by_size().values():
+                    table_name = experiment_table.__name__
+                    print(f"Testing {base_async_method.__name__} for {table_name} with {in_flight} in flight...")
+                    method = getattr(experiment_table, base_async_method.__name__)
+                    durations_ms, cache_state = measure_async_method(
+                        runner, pool, experiment_table, method, input_size, columns, options, in_flight
+                    )
+                    record_samples(results, table_name, method_name, durations_ms, cache_state)
+        finally:
+            runner.run(pool.close())
+
+    configuration_id = save_results(results, None, options, kind="async", filename_tag=f"async_{in_flight}inflight_")
+    print(
+        f"Async experiments completed. Results saved to {settings.RESULTS_STORE_PATH} (configuration {configuration_id})"
+    )
@@ -0,0 +1,192 @@
+import fcntl
+import logging
+import math
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Literal
+
+import numpy as np
+from django.conf import settings
+
+from experiments.utils import key_column_prefixes, key_digests
+
+if TYPE_CHECKING:
+    from experiments.models import ExperimentBase
+
+logger = logging.getLogger(__name__)
+
+BLOOM_FILTER_HEADER_BYTES = 16  # Number of bits and number of hashes, as 2 uint64
+
+
+def bloom_filter_path(experiment_table: type["ExperimentBase"], columns: list[str]) -> Path:
+    return Path(settings.BLOOM_FILTER_DIR) / f"{experiment_table._meta.db_table}__{'__'.join(columns)}.bloom"
+
+
+def optimal_parameters(capacity: int, false_positive_rate: float) -> tuple[int, int]:
+    """Number of bits and of hashes of a Bloom filter of capacity keys with the false positive rate."""
+    number_of_bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+    number_of_hashes = max(1, round(number_of_bits / capacity * math.log(2)))
+    return number_of_bits, number_of_hashes
+
+
+def key_positions(keys: Iterable[tuple], number_of_bits: int, number_of_hashes: int) -> np.ndarray:
+    """Bit positions of each key, one row per key, with the double hashing of a 128 bits BLAKE2b digest."""
+    hashes = np.frombuffer(key_digests(keys, digest_size=16), dtype="<u8").reshape(-1, 2)
+    # Unsigned overflows wrap around
+    positions = hashes[:, :1] + np.arange(number_of_hashes, dtype=np.uint64) * hashes[:, 1:]
+    return positions % np.uint64(number_of_bits)
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Exclusive lock between the processes writing the file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path.with_suffix(".lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class BloomFilter:
+    """Bloom filter of key tuples, with its bits in a memory-mapped file shared by the processes using it.
+
+    Keys are never removed: deleted rows only make the filter return more false positives.
+    """
+
+    def __init__(self, path: Path, mode: Literal["r", "r+"] = "r") -> None:
+        self.path = path
+        header = np.fromfile(path, dtype="<u8", count=2)
+        self.number_of_bits, self.number_of_hashes = int(header[0]), int(header[1])
+        self.bits = np.memmap(path, dtype=np.uint8, mode=mode, offset=BLOOM_FILTER_HEADER_BYTES)
+
+    @classmethod
+    def create(cls, path: Path, capacity: int, false_positive_rate: float) -> "BloomFilter":
+        """Create an empty filter file sized for capacity keys. The file is sparse until bits are set."""
+        number_of_bits, number_of_hashes = optimal_parameters(capacity, false_positive_rate)
+        with open(path, "wb") as bloom_file:
+            bloom_file.write(np.array([number_of_bits, number_of_hashes], dtype="<u8").tobytes())
+            bloom_file.truncate(BLOOM_FILTER_HEADER_BYTES + -(-number_of_bits // 8))
+        return cls(path, mode="r+")
+
+    def add(self, keys: list[tuple]) -> None:
+        if not keys:
+            return
+
+        positions = key_positions(keys, self.number_of_bits, self.number_of_hashes).ravel()
+        np.bitwise_or.at(
+            self.bits, positions >> np.uint64(3), np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)
+        )
+        self.bits.flush()
+
+    def contains(self, keys: list[tuple]) -> np.ndarray:
+        """Whether each key may be in the filter. False is always right, True is wrong at the false positive rate."""
+        if not keys:
+            return np.zeros(0, dtype=bool)
+
+        positions = key_positions(keys, self.number_of_bits, self.number_of_hashes)
+        is_set = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return is_set.all(axis=1)
+
+    def statistics(self) -> dict[str, Any]:
+        """Size of the filter, and its false positive rate estimated from the ratio of bits set."""
+        fill_ratio = int(np.bitwise_count(self.bits).sum(dtype=np.int64)) / self.number_of_bits
+        return {
+            "number_of_bits": self.number_of_bits,
+            "number_of_hashes": self.number_of_hashes,
+            "memory_bytes": BLOOM_FILTER_HEADER_BYTES + self.bits.nbytes,
+            "fill_ratio": fill_ratio,
+            "estimated_false_positive_rate": fill_ratio**self.number_of_hashes,
+        }
+
+
+def create_bloom_filters(experiment_table: type["ExperimentBase"], key_columns: list[str]) -> None:
+    """Create the missing filters of the table, on each prefix of the key columns, before its first rows are loaded.
+
+    Filters cannot be created later, as they would miss the rows already in the table:
+    rebuild them with rebuild_bloom_filters() instead.
+    """
+    for columns in key_column_prefixes(key_columns):
+        path = bloom_filter_path(experiment_table, columns)
+        with file_lock(path):
+            if not path.exists():
+                BloomFilter.create(path, experiment_table._max_count, settings.BLOOM_FILTER_FALSE_POSITIVE_RATE)
+
+
+def add_to_bloom_filters(
+    experiment_table: type["ExperimentBase"], profiles: list[dict], key_columns: list[str]
+) -> None:
+    """Add a batch of inserted profiles to the existing filters of the table, on each prefix of the key columns."""
+    for columns in key_column_prefixes(key_columns):
+        path = bloom_filter_path(experiment_table, columns)
+        if not path.exists():
+            continue
+
+        with file_lock(path):
+            BloomFilter(path, mode="r+").add([tuple(profile[column] for column in columns) for profile in profiles])
+
+
+def discard_bloom_filters(experiment_table: type["ExperimentBase"], key_columns: list[str]) -> None:
+    """Delete the filters of a table loaded without maintaining them, as they would miss the new rows."""
+    for columns in key_column_prefixes(key_columns):
+        path = bloom_filter_path(experiment_table, columns)
+        with file_lock(path):
+            if path.exists():
+                path.unlink()
+                logger.warning(f"Discarded {path}: rebuild it with the build_bloom_filters command")
+
+
+def rebuild_bloom_filters(experiment_table: type["ExperimentBase"], key_columns: list[str], batch_size: int) -> None:
+    """Build the filters of the table from the rows already in it, read once in batches of batch_size."""
+    column_prefixes = key_column_prefixes(key_columns)
+    with ExitStack() as stack:
+        bloom_filters = []
+        for columns in column_prefixes:
+            path = bloom_filter_path(experiment_table, columns)
+            stack.enter_context(file_lock(path))
+            bloom_filters.append(
+                BloomFilter.create(path, experiment_table._max_count, settings.BLOOM_FILTER_FALSE_POSITIVE_RATE)
+            )
+
+        rows = experiment_table.objects.values_list(*key_columns).iterator(chunk_size=batch_size)
+        while batch := list(islice(rows, batch_size)):
+            for columns, bloom_filter in zip(column_prefixes, bloom_filters, strict=True):
+                bloom_filter.add([row[: len(columns)] for row in batch])
+
+    for bloom_filter in bloom_filters:
+        logger.info(f"Rebuilt {bloom_filter.path}: {bloom_filter.statistics()}")
+
+
+def prefiltered_method(
+    experiment_table: type["ExperimentBase"], method: Callable, counters: Counter
+) -> Callable[[list[tuple], list[str]], float | None]:
+    """Wrap a filter method of an experiment table to drop the inputs absent from the Bloom filter of its columns.
+
+    Inputs are passed through when the table has no filter for the columns.
+    The method is not called when no input is left, as no row can match.
+    """
+    bloom_filters: dict[tuple[str, ...], BloomFilter | None] = {}
+
+    @wraps(method)
+    def wrapper(inputs: list[tuple], input_columns: list[str]) -> float | None:
+        if tuple(input_columns) not in bloom_filters:
+            path = bloom_filter_path(experiment_table, input_columns)
+            bloom_filters[tuple(input_columns)] = BloomFilter(path) if path.exists() else None
+        bloom_filter = bloom_filters[tuple(input_columns)]
+        if bloom_filter is None:
+            return method(inputs, input_columns)
+
+        kept_inputs = [
+            input_tuple for input_tuple, kept in zip(inputs, bloom_filter.contains(inputs), strict=True) if kept
+        ]
+        counters["checked_inputs"] += len(inputs)
+        counters["dropped_inputs"] += len(inputs) - len(kept_inputs)
+        if not kept_inputs:
+            return None
+        return method(kept_inputs, input_columns)
+
+    return wrapper
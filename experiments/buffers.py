@@ -0,0 +1,98 @@
+import logging
+import subprocess
+import time
+
+from django.db import OperationalError, connection
+
+from experiments.models import ExperimentBase
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ["as-is", "warm", "cold"]
+DEFAULT_CACHE_MODE = "as-is"
+RECONNECT_TIMEOUT_SECONDS = 60
+PG_BUFFERCACHE_EVICT_VERSION = 170000
+PG_BUFFERCACHE_EVICT_RELATION_VERSION = 180000
+
+
+def relation_names(experiment_table: type[ExperimentBase]) -> list[str]:
+    """Names of the table and of all its indexes.
+
+    The rows and indexes of a partitioned table are stored in its partitions: the names of the partitions
+    and of their indexes are returned instead.
+    """
+    table_name = connection.ops.quote_name(experiment_table._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relid::regclass::text FROM pg_partition_tree(%s::regclass) WHERE isleaf", [table_name])
+        table_names = [partition_name for (partition_name,) in cursor.fetchall()] or [table_name]
+        cursor.execute(
+            "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = ANY(%s::regclass[])", [table_names]
+        )
+        return table_names + [index_name for (index_name,) in cursor.fetchall()]
+
+
+def server_version() -> int:
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW server_version_num")
+        return int(cursor.fetchone()[0])
+
+
+def prewarm(experiment_table: type[ExperimentBase]) -> int:
+    """Load the table and its indexes into shared_buffers with pg_prewarm. Return the number of blocks loaded."""
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_prewarm")
+        blocks = 0
+        for relation_name in relation_names(experiment_table):
+            cursor.execute("SELECT pg_prewarm(%s::regclass)", [relation_name])
+            blocks += cursor.fetchone()[0]
+
+    logger.info(f"Prewarmed {blocks} blocks of {experiment_table.__name__}")
+    return blocks
+
+
+def evict_buffers(experiment_table: type[ExperimentBase]) -> int | None:
+    """Evict the table and its indexes from shared_buffers with pg_buffercache, available from PostgreSQL 17.
+
+    Return the number of buffers evicted, None if the server cannot evict buffers.
+    """
+    pg_version = server_version()
+    if pg_version < PG_BUFFERCACHE_EVICT_VERSION:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_buffercache")
+        evicted_buffers = 0
+        for relation_name in relation_names(experiment_table):
+            if pg_version >= PG_BUFFERCACHE_EVICT_RELATION_VERSION:
+                cursor.execute(
+                    "SELECT buffers_evicted FROM pg_buffercache_evict_relation(%s::regclass)", [relation_name]
+                )
+            else:
+                cursor.execute(
+                    "SELECT count(*) FILTER (WHERE pg_buffercache_evict(bufferid)) FROM pg_buffercache "
+                    "WHERE relfilenode = pg_relation_filenode(%s::regclass) "
+                    "AND reldatabase = (SELECT oid FROM pg_database WHERE datname = current_database())",
+                    [relation_name],
+                )
+            evicted_buffers += cursor.fetchone()[0]
+
+    return evicted_buffers
+
+
+def run_evict_command(evict_command: str) -> None:
+    """Run a shell command evicting caches out of reach of SQL, e.g. the OS page cache of the database host.
+
+    The command may restart the database server: the connection is closed before and re-opened after it.
+    """
+    connection.close()
+    subprocess.run(evict_command, shell=True, check=True)
+
+    deadline = time.monotonic() + RECONNECT_TIMEOUT_SECONDS
+    while True:
+        try:
+            connection.ensure_connection()
+            return
+        except OperationalError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(1)
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import logging
+from collections import Counter
+from functools import wraps
+from typing import TYPE_CHECKING, Callable, cast
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from config.redis import REDIS_CACHE_DB, get_redis_client
+
+if TYPE_CHECKING:
+    from experiments.models import ExperimentBase
+
+DEFAULT_RESULT_CACHE_TTL_SECONDS = 60 * 60  # 1 hour
+CACHE_KEY_PREFIX = "filter_rows"
+CACHED_METHODS = ["filter_rows_with_in_tuples", "filter_rows_with_conditions"]
+# Input sets drawn once per method and table, and replayed across the runs, so that the runs after the first
+# ones can hit the cache
+DEFAULT_CACHED_INPUT_SETS = 1
+
+logger = logging.getLogger(__name__)
+
+
+def table_version_key(experiment_table: type["ExperimentBase"]) -> str:
+    return f"{CACHE_KEY_PREFIX}:{experiment_table._meta.label_lower}:version"
+
+
+def invalidate_table(experiment_table: type["ExperimentBase"]) -> int:
+    """Invalidate the cached results of the table by bumping its version, which is part of the cache keys.
+
+    Previous entries are not deleted: they can no longer be read and expire with their TTL.
+    """
+    return cast(int, get_redis_client(db=REDIS_CACHE_DB).incr(table_version_key(experiment_table)))
+
+
+def invalidate_table_if_reachable(experiment_table: type["ExperimentBase"]) -> None:
+    """Invalidate the cached results of the table after loading rows, when Redis is reachable.
+
+    The result cache is opt-in: loading rows does not need Redis, and only warns when it cannot be reached.
+    """
+    try:
+        invalidate_table(experiment_table)
+    except RedisConnectionError as error:
+        logger.warning(f"Cached results of {experiment_table.__name__} not invalidated, Redis is unreachable: {error}")
+
+
+def cache_key(experiment_table: type["ExperimentBase"], inputs: list[tuple], input_columns: list[str]) -> str:
+    """Key of the result of filtering the table by the set of inputs, whatever their order and duplicates."""
+    version = cast(bytes | None, get_redis_client(db=REDIS_CACHE_DB).get(table_version_key(experiment_table)))
+    # Inputs are serialized before sorting, as emails can be None
+    canonical_inputs = sorted({json.dumps(list(input_tuple)) for input_tuple in inputs})
+    digest = hashlib.sha256(
+        json.dumps([experiment_table._meta.label_lower, input_columns, canonical_inputs]).encode()
+    ).hexdigest()
+    return f"{CACHE_KEY_PREFIX}:{experiment_table._meta.label_lower}:v{int(version or 0)}:{digest}"
+
+
+def cached_method(
+    experiment_table: type["ExperimentBase"],
+    method: Callable,
+    counters: Counter,
+    ttl: int = DEFAULT_RESULT_CACHE_TTL_SECONDS,
+) -> Callable[[list[tuple], list[str]], float | None]:
+    """Wrap a filter method of an experiment table to serve its results from Redis, counting hits and misses.
+
+    All filter methods return the same average for the same inputs, so the cached results are shared between them.
+    """
+
+    @wraps(method)
+    def wrapper(inputs: list[tuple], input_columns: list[str]) -> float | None:
+        redis_client = get_redis_client(db=REDIS_CACHE_DB)
+        key = cache_key(experiment_table, inputs, input_columns)
+        cached_result = cast(bytes | None, redis_client.get(key))
+        if cached_result is not None:
+            counters["hits"] += 1
+            return json.loads(cached_result)
+
+        counters["misses"] += 1
+        result = method(inputs, input_columns)
+        redis_client.set(key, json.dumps(result), ex=ttl)
+        return result
+
+    return wrapper
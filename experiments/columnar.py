@@ -0,0 +1,136 @@
+import logging
+import os
+import shutil
+import time
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable
+
+import numpy as np
+from django.conf import settings
+
+from experiments.utils import key_column_prefixes, key_digests, numeric_average
+
+if TYPE_CHECKING:
+    from experiments.models import ExperimentBase
+
+logger = logging.getLogger(__name__)
+
+KEYS_FILENAME = "keys.npy"
+AGE_SUMS_FILENAME = "age_sums.npy"
+
+
+def columnar_index_dir(experiment_table: type["ExperimentBase"], columns: list[str]) -> Path:
+    return Path(settings.COLUMNAR_INDEX_DIR) / f"{experiment_table._meta.db_table}__{'__'.join(columns)}"
+
+
+def key_hashes(keys: Iterable[tuple]) -> np.ndarray:
+    """64 bits BLAKE2b hash of each key tuple, as rows and inputs are compared by their hashes."""
+    return np.frombuffer(key_digests(keys, digest_size=8), dtype="<u8")
+
+
+def export_columnar_index(
+    experiment_table: type["ExperimentBase"], key_columns: list[str], batch_size: int
+) -> dict[str, dict[str, Any]]:
+    """Export the table into memory-mapped NumPy files, one directory per prefix of the key columns.
+
+    Each directory holds the sorted hashes of the keys of all rows, and the running sums of the ages of the rows
+    in the same order: the rows of a key are a range of the hashes, and their total age the difference
+    of the running sums at the bounds of the range.
+    Rows with a NULL in the key are left out, as NULL never matches an input in SQL.
+    The table is read once. A previous export is replaced when the new one is complete.
+    Return the number of rows, size in bytes and build time in ms of each directory.
+    """
+    start_time = time.perf_counter()
+    column_prefixes = key_column_prefixes(key_columns)
+    ages_by_prefix: list[list[np.ndarray]] = [[] for _ in column_prefixes]
+    hashes_by_prefix: list[list[np.ndarray]] = [[] for _ in column_prefixes]
+    # Fields of a values_list are distinct: the age is read with the key columns when it is one of them
+    fields = key_columns if "age" in key_columns else [*key_columns, "age"]
+    age_position = fields.index("age")
+    rows = experiment_table.objects.order_by().values_list(*fields).iterator(chunk_size=batch_size)
+    while batch := list(islice(rows, batch_size)):
+        batch_ages = np.fromiter((row[age_position] for row in batch), dtype=np.int64, count=len(batch))
+        for columns, ages, hashes in zip(column_prefixes, ages_by_prefix, hashes_by_prefix, strict=True):
+            keys = [row[: len(columns)] for row in batch]
+            has_key = np.fromiter((None not in key for key in keys), dtype=bool, count=len(keys))
+            ages.append(batch_ages[has_key])
+            hashes.append(key_hashes(key for key in keys if None not in key))
+    read_ms = (time.perf_counter() - start_time) * 1000
+
+    exports = {}
+    for columns, ages, hashes in zip(column_prefixes, ages_by_prefix, hashes_by_prefix, strict=True):
+        start_time = time.perf_counter()
+        all_ages = np.concatenate(ages) if ages else np.zeros(0, dtype=np.int64)
+        all_hashes = np.concatenate(hashes) if hashes else np.zeros(0, dtype="<u8")
+        order = np.argsort(all_hashes, kind="stable")
+        index_dir = columnar_index_dir(experiment_table, columns)
+        new_index_dir = index_dir.with_name(f"{index_dir.name}.{os.getpid()}.new")
+        new_index_dir.mkdir(parents=True)
+        np.save(new_index_dir / KEYS_FILENAME, all_hashes[order])
+        np.save(new_index_dir / AGE_SUMS_FILENAME, np.concatenate([[0], np.cumsum(all_ages[order])]))
+        replace_dir(new_index_dir, index_dir)
+        exports[index_dir.name] = {
+            "rows": len(all_hashes),
+            "size_bytes": sum(path.stat().st_size for path in index_dir.iterdir()),
+            "build_ms": read_ms + (time.perf_counter() - start_time) * 1000,
+        }
+        logger.info(f"Exported {index_dir}: {exports[index_dir.name]}")
+
+    return exports
+
+
+def replace_dir(new_dir: Path, target_dir: Path) -> None:
+    """Move the directory in place of the target. Processes keep reading the files they mapped from the target."""
+    if target_dir.exists():
+        old_dir = target_dir.with_name(f"{target_dir.name}.{os.getpid()}.old")
+        target_dir.rename(old_dir)
+        new_dir.rename(target_dir)
+        shutil.rmtree(old_dir)
+    else:
+        new_dir.rename(target_dir)
+
+
+class ColumnarIndex:
+    """Rows of a table exported by export_columnar_index, answering filter queries without the database.
+
+    The files are memory-mapped read-only: the processes of a server share them through the page cache.
+    Keys are compared by their 64 bits hashes. A collision between keys would add the rows of one to the other,
+    with a probability below 1e-4 on 50M distinct keys.
+    """
+
+    # Opened indexes of the process by directory, with the inode of the directory when opened
+    _opened: dict[Path, tuple[int, "ColumnarIndex"]] = {}
+
+    def __init__(self, index_dir: Path) -> None:
+        self.keys = np.load(index_dir / KEYS_FILENAME, mmap_mode="r")
+        self.age_sums = np.load(index_dir / AGE_SUMS_FILENAME, mmap_mode="r")
+
+    @classmethod
+    def open(cls, experiment_table: type["ExperimentBase"], columns: list[str]) -> "ColumnarIndex":
+        """Index of the table on the columns, reopened when it was exported again.
+
+        Raise FileNotFoundError if the table was not exported on the columns.
+        """
+        index_dir = columnar_index_dir(experiment_table, columns)
+        inode = index_dir.stat().st_ino
+        if index_dir not in cls._opened or cls._opened[index_dir][0] != inode:
+            cls._opened[index_dir] = (inode, cls(index_dir))
+        return cls._opened[index_dir][1]
+
+    def sum_and_count(self, inputs: list[tuple]) -> tuple[int, int]:
+        """Total age and number of the rows matching the inputs, each distinct input counted once.
+
+        Inputs with a None never match, as NULL in SQL.
+        """
+        hashes = np.unique(key_hashes(input_tuple for input_tuple in inputs if None not in input_tuple))
+        starts = np.searchsorted(self.keys, hashes, side="left")
+        ends = np.searchsorted(self.keys, hashes, side="right")
+        return int((self.age_sums[ends] - self.age_sums[starts]).sum()), int((ends - starts).sum())
+
+    def average_age(self, inputs: list[tuple]) -> float | None:
+        """Average age of the rows matching the inputs, rounded as AVG by PostgreSQL."""
+        total_age, count = self.sum_and_count(inputs)
+        if not count:
+            return None
+        return float(numeric_average(total_age, count))
@@ -0,0 +1,151 @@
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
+
+import django
+from django.apps import apps
+from django.db import connections, transaction
+from django.db.models import F
+
+from experiments.bloom import create_bloom_filters, discard_bloom_filters
+from experiments.cache import invalidate_table_if_reachable
+from experiments.models import ALL_INPUT_COLUMNS, ExperimentBase, GenerationRange, KeySummary
+from experiments.utils import iter_fake_profiles
+
+logger = logging.getLogger(__name__)
+
+
+def plan_generation_ranges(
+    experiment_table: type[ExperimentBase], number_of_ranges: int, number_of_rows: int | None = None
+) -> list[GenerationRange]:
+    """Return the ranges of rows left to generate for the table.
+
+    The incomplete ranges of an interrupted load are resumed from their checkpoints.
+    The table is only counted when planning a new load, after the previous one is complete.
+
+    :param number_of_ranges: number of ranges to split a new load into.
+    :param number_of_rows: limit the number of rows of a new load if provided.
+    """
+    table_name = experiment_table.__name__
+    generation_ranges = list(GenerationRange.objects.filter(table_name=table_name).order_by("range_start"))
+    incomplete_ranges = [generation_range for generation_range in generation_ranges if generation_range.rows_remaining]
+    if incomplete_ranges:
+        rows_remaining = sum(generation_range.rows_remaining for generation_range in incomplete_ranges)
+        logger.info(f"Resuming {len(incomplete_ranges)} ranges for {table_name}: {rows_remaining=}")
+        return incomplete_ranges
+
+    current_count = experiment_table.objects.count()
+    max_rows_to_create = experiment_table._max_count - current_count
+    number_to_create = min(number_of_rows or max_rows_to_create, max_rows_to_create)
+    GenerationRange.objects.filter(table_name=table_name).delete()
+    if number_to_create <= 0:
+        return []
+
+    range_end = current_count + number_to_create
+    range_size = -(-number_to_create // number_of_ranges)  # Ceiling division
+    logger.info(f"Planning {table_name}: {current_count=} | {number_to_create=} | {range_size=}")
+    return GenerationRange.objects.bulk_create(
+        GenerationRange(table_name=table_name, range_start=start, range_end=min(start + range_size, range_end))
+        for start in range(current_count, range_end, range_size)
+    )
+
+
+def close_connections_before_fork() -> None:
+    """Close the connections of the parent and their pools, so that forked processes do not inherit their sockets.
+
+    Closing a pooled connection only returns it to its pool: processes sharing the pool would send their queries,
+    and prepare their statements, on the same server sessions.
+    """
+    for db_connection in connections.all(initialized_only=True):
+        db_connection.close()
+        # Only the PostgreSQL backend has pools
+        if getattr(db_connection, "pool", None) is not None:
+            db_connection.close_pool()  # type: ignore[attr-defined]
+
+
+def init_worker_process() -> None:
+    # Spawned processes start without Django: forked ones already have it set up
+    if not apps.ready:
+        django.setup()
+
+
+def generate_rows_range(range_id: int, **generation_options: Any) -> int:
+    """Generate the remaining rows of a range, committing its checkpoint together with each batch."""
+    generation_range = GenerationRange.objects.get(pk=range_id)
+    experiment_table = apps.get_model("experiments", generation_range.table_name)
+    seed = generation_options.get("seed")
+    if seed is not None:
+        # Do not generate the same profiles in every range, nor again when resuming
+        seed += generation_range.range_start + generation_range.rows_generated
+
+    rows_remaining = generation_range.rows_remaining
+    for profiles in iter_fake_profiles(
+        rows_remaining, generation_options["bulk_size"], generation_options["generator"], seed
+    ):
+        with transaction.atomic():
+            experiment_table.insert_profiles(
+                profiles,
+                generation_options["engine"],
+                generation_options.get("key_summaries", True),
+                generation_options.get("bloom_filters", True),
+            )
+            GenerationRange.objects.filter(pk=range_id).update(rows_generated=F("rows_generated") + len(profiles))
+
+    return rows_remaining
+
+
+def generate_rows_in_parallel(
+    experiment_tables: list[type[ExperimentBase]],
+    workers: int,
+    number_of_rows: int | None = None,
+    **generation_options: Any,
+) -> None:
+    """Generate the rows of all tables from a pool of processes, each with its own database connection.
+
+    :param workers: number of processes, also the number of ranges each table is split into.
+    :param number_of_rows: limit the number of rows per table if provided.
+    :param generation_options: bulk_size, engine, generator, seed, key_summaries and bloom_filters,
+        as for bulk_generate_rows.
+    """
+    for experiment_table in experiment_tables:
+        if not generation_options.get("key_summaries", True):
+            KeySummary.discard(experiment_table)
+        # The workers only add their rows to the filters created with the first rows of the table
+        if not generation_options.get("bloom_filters", True):
+            discard_bloom_filters(experiment_table, ALL_INPUT_COLUMNS)
+        elif not experiment_table.objects.exists():
+            create_bloom_filters(experiment_table, ALL_INPUT_COLUMNS)
+    generation_ranges = [
+        generation_range
+        for experiment_table in experiment_tables
+        for generation_range in plan_generation_ranges(experiment_table, workers, number_of_rows)
+    ]
+    number_to_create = sum(generation_range.rows_remaining for generation_range in generation_ranges)
+    logger.info(f"Generating {number_to_create} rows in {len(generation_ranges)} ranges with {workers} workers")
+
+    close_connections_before_fork()
+    number_created = 0
+    start_time = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker_process) as executor:
+            futures = {
+                executor.submit(generate_rows_range, generation_range.pk, **generation_options): generation_range
+                for generation_range in generation_ranges
+            }
+            for future in as_completed(futures):
+                generation_range = futures[future]
+                number_created += future.result()
+                logger.info(
+                    f"Range {generation_range.range_start}-{generation_range.range_end} of "
+                    f"{generation_range.table_name} completed. "
+                    f"Number to create remaining: {number_to_create - number_created}"
+                )
+    finally:
+        # The batches of the other workers are committed even when one of them fails
+        for experiment_table in experiment_tables:
+            invalidate_table_if_reachable(experiment_table)
+
+    duration = time.perf_counter() - start_time
+    rows_per_second = number_created / duration if duration else 0.0
+    logger.info(f"Generated {number_created} rows in {duration:.2f} s ({rows_per_second:.0f} rows/s)")
@@ -0,0 +1,102 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator, cast
+
+from django.contrib.postgres.indexes import HashIndex
+from django.db import connection, models
+from django.db.backends.postgresql.schema import DatabaseSchemaEditor
+
+from experiments.models import ExperimentBase
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INDEX_VARIANT = "default"
+# Indexes added to the (first_name, last_name) index of ExperimentBase.Meta, by variant
+INDEX_VARIANTS: dict[str, list[models.Index]] = {
+    DEFAULT_INDEX_VARIANT: [],
+    # Index-only scans for the 2 columns experiments, the average age is read from the index
+    "covering": [models.Index(fields=["first_name", "last_name"], include=["age"], name="covering")],
+    # One composite index per number of columns above 2
+    "composite": [
+        models.Index(fields=["first_name", "last_name", "age"], name="composite_3"),
+        models.Index(fields=["first_name", "last_name", "age", "email"], name="composite_4"),
+    ],
+    # Email has no index by default, equality lookups only
+    "hash": [HashIndex(fields=["email"], name="email_hash")],
+}
+
+
+def variant_indexes(experiment_table: type[ExperimentBase], variant: str) -> list[models.Index]:
+    """Indexes of the variant named for the table, as index names are unique in the schema."""
+    if variant not in INDEX_VARIANTS:
+        raise ValueError(f"Unknown index variant: {variant}. Available variants: {list(INDEX_VARIANTS)}")
+
+    indexes = []
+    for index in INDEX_VARIANTS[variant]:
+        table_index = index.clone()
+        table_index.name = f"{experiment_table._meta.db_table}_{index.name}"
+        indexes.append(table_index)
+    return indexes
+
+
+def index_size(index_name: str) -> int:
+    """Size in bytes of the index, summed over the indexes of the partitions for a partitioned index."""
+    index_name = connection.ops.quote_name(index_name)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_relation_size(%s::regclass) + COALESCE(SUM(pg_relation_size(relid)), 0) "
+            "FROM pg_partition_tree(%s::regclass)",
+            [index_name, index_name],
+        )
+        return int(cursor.fetchone()[0])
+
+
+def create_index_variant(experiment_table: type[ExperimentBase], variant: str) -> dict[str, dict[str, Any]]:
+    """Create the indexes of the variant on the table with CREATE INDEX CONCURRENTLY, without blocking writes.
+
+    Return the size in bytes and build time in ms of each index.
+    Indexes left by an interrupted run are dropped first, as a failed concurrent build leaves an invalid index.
+    Indexes of partitioned tables cannot be built concurrently: they lock the table while they are built.
+    """
+    drop_index_variant(experiment_table, variant)
+    builds = {}
+    # Concurrent index builds cannot run in a transaction
+    with connection.schema_editor(atomic=False) as base_schema_editor:
+        schema_editor = cast(DatabaseSchemaEditor, base_schema_editor)
+        for index in variant_indexes(experiment_table, variant):
+            start_time = time.perf_counter()
+            schema_editor.add_index(experiment_table, index, concurrently=not experiment_table._partitioned)
+            build_ms = (time.perf_counter() - start_time) * 1000
+            builds[index.name] = {"size_bytes": index_size(index.name), "build_ms": build_ms}
+            logger.info(f"Built {index.name} in {build_ms:.0f} ms ({builds[index.name]['size_bytes']} bytes)")
+
+    return builds
+
+
+def drop_index_variant(experiment_table: type[ExperimentBase], variant: str) -> None:
+    """Drop the indexes of the variant from the table with DROP INDEX CONCURRENTLY IF EXISTS.
+
+    Indexes of partitioned tables cannot be dropped concurrently.
+    """
+    with connection.schema_editor(atomic=False) as base_schema_editor:
+        schema_editor = cast(DatabaseSchemaEditor, base_schema_editor)
+        for index in variant_indexes(experiment_table, variant):
+            schema_editor.remove_index(experiment_table, index, concurrently=not experiment_table._partitioned)
+
+
+@contextmanager
+def index_variant(variant: str) -> Iterator[dict[str, dict[str, dict[str, Any]]]]:
+    """Create the indexes of the variant on all experiment tables, and drop them on exit.
+
+    Yield the size and build time of each index by table name.
+    """
+    experiment_tables = list(ExperimentBase.submodels_by_size().values())
+    try:
+        yield {
+            experiment_table.__name__: create_index_variant(experiment_table, variant)
+            for experiment_table in experiment_tables
+        }
+    finally:
+        for experiment_table in experiment_tables:
+            drop_index_variant(experiment_table, variant)
@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from importlib import import_module
+from typing import Any, Callable, Iterator
+
+from django.db import connection
+from django.db.models.sql.compiler import SQLCompiler
+
+EXPLAIN_OPTIONS = "ANALYZE, BUFFERS, FORMAT JSON"
+
+
+def _plan_node_types(plan: dict[str, Any]) -> list[str]:
+    node_types = [plan["Node Type"]]
+    for sub_plan in plan.get("Plans", []):
+        node_types += _plan_node_types(sub_plan)
+    return node_types
+
+
+@contextmanager
+def capture_explain_plans() -> Iterator[list[dict[str, Any]]]:
+    """Capture the plan of every SELECT query executed in the block with EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON).
+
+    The EXPLAIN runs just before the query on the same cursor, so it sees the same session state
+    (e.g. temporary tables). It also executes the query, so the queries of the block run twice.
+    """
+    plans: list[dict[str, Any]] = []
+
+    def explain_wrapper(execute: Callable, sql: str, params: Any, many: bool, context: dict[str, Any]) -> Any:
+        if not many and sql.lstrip().upper().startswith("SELECT"):
+            # Execute on the underlying cursor: the Django cursor would go through this wrapper again
+            cursor = context["cursor"].cursor
+            with context["connection"].wrap_database_errors:
+                cursor.execute(f"EXPLAIN ({EXPLAIN_OPTIONS}) {sql}", params)
+                explain_output = cursor.fetchone()[0]
+            # The json type is already decoded by psycopg
+            plan = (json.loads(explain_output) if isinstance(explain_output, str) else explain_output)[0]
+            plans.append(
+                {
+                    "sql": sql,
+                    "planning_time_ms": plan["Planning Time"],
+                    "execution_time_ms": plan["Execution Time"],
+                    "estimated_rows": plan["Plan"]["Plan Rows"],
+                    "actual_rows": plan["Plan"]["Actual Rows"],
+                    "node_types": _plan_node_types(plan["Plan"]),
+                    "plan": plan,
+                }
+            )
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(explain_wrapper):
+        yield plans
+
+
+def _compiler_classes() -> list[type[SQLCompiler]]:
+    """Compiler classes of the database backend defining their own as_sql, e.g. the PostgreSQL insert compiler."""
+    compiler_module = import_module(connection.ops.compiler_module)
+    compiler_classes = {
+        value for value in vars(compiler_module).values() if isinstance(value, type) and issubclass(value, SQLCompiler)
+    }
+    return [compiler_class for compiler_class in compiler_classes if "as_sql" in vars(compiler_class)]
+
+
+@contextmanager
+def capture_phases() -> Iterator[dict[str, Any]]:
+    """Time the SQL compilation and execution of the queries run in the block by the current thread,
+    and count their SQL text length and bind parameters.
+
+    Compilation is timed by wrapping as_sql of the compiler classes, and only the outermost call is counted,
+    as compilers compile subqueries with nested calls. Execution is timed by an execute wrapper: it covers the
+    network round trip, the server execution and fetching the rows, as the client cursor fetches them all.
+    The time left in the block is spent in Python building the query and converting its result.
+    Queries run by other threads on their own connections are not counted (e.g. by parallel chunks).
+    """
+    phases: dict[str, Any] = {"compile_ms": 0.0, "execute_ms": 0.0, "queries": 0, "sql_length": 0, "bind_params": 0}
+    thread_id = threading.get_ident()
+    compile_depth = 0
+
+    def timed_as_sql(as_sql: Callable) -> Callable:
+        @wraps(as_sql)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            nonlocal compile_depth
+            if threading.get_ident() != thread_id or compile_depth:
+                return as_sql(*args, **kwargs)
+
+            compile_depth += 1
+            start_time = time.perf_counter()
+            try:
+                return as_sql(*args, **kwargs)
+            finally:
+                phases["compile_ms"] += (time.perf_counter() - start_time) * 1000
+                compile_depth -= 1
+
+        return wrapper
+
+    def phases_wrapper(execute: Callable, sql: str, params: Any, many: bool, context: dict[str, Any]) -> Any:
+        start_time = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            phases["execute_ms"] += (time.perf_counter() - start_time) * 1000
+            phases["queries"] += 1
+            phases["sql_length"] += len(sql)
+            if params:
+                phases["bind_params"] += sum(map(len, params)) if many else len(params)
+
+    original_as_sqls = {compiler_class: vars(compiler_class)["as_sql"] for compiler_class in _compiler_classes()}
+    for compiler_class, as_sql in original_as_sqls.items():
+        compiler_class.as_sql = timed_as_sql(as_sql)  # type: ignore[method-assign]
+    try:
+        with connection.execute_wrapper(phases_wrapper):
+            yield phases
+    finally:
+        for compiler_class, as_sql in original_as_sqls.items():
+            compiler_class.as_sql = as_sql  # type: ignore[method-assign]
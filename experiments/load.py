@@ -0,0 +1,175 @@
+import http.client
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any
+from urllib.parse import urlsplit
+
+import numpy as np
+from django.apps import apps
+from django.conf import settings
+from django.db import connection
+
+from experiments.generation import close_connections_before_fork, init_worker_process
+from experiments.models import ALL_INPUT_COLUMNS, ExperimentBase
+from experiments.results_store import save_configuration
+from experiments.runner import ExperimentOptions, generate_inputs, index_variant_tag
+from experiments.utils import save_to_json
+
+DEFAULT_LOAD_DURATION_SECONDS = 30
+LOAD_INPUT_SETS = 100
+# Time given to the worker processes to start and connect before the measured window
+LOAD_START_DELAY_SECONDS = 2.0
+
+
+def run_load_worker(
+    table_name: str, method_name: str, columns: list[str], input_sets: list[list[tuple]], window: tuple[float, float]
+) -> list[float]:
+    """Call the method in a loop during the window and return the latency in ms of each call.
+
+    Runs in its own process, with its own database connection.
+    """
+    method = getattr(apps.get_model("experiments", table_name), method_name)
+    start_at, end_at = window
+    connection.ensure_connection()
+    time.sleep(max(0.0, start_at - time.monotonic()))
+
+    latencies_ms: list[float] = []
+    while time.monotonic() < end_at:
+        inputs = input_sets[len(latencies_ms) % len(input_sets)]
+        start_time = time.perf_counter()
+        method(inputs, columns)
+        latencies_ms.append((time.perf_counter() - start_time) * 1000)
+
+    connection.close()
+    return latencies_ms
+
+
+def summarize_load(latencies_ms: list[float], concurrency: int, duration: float) -> dict[str, float | int]:
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if latencies_ms else (0.0, 0.0, 0.0)
+    return {
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "queries": len(latencies_ms),
+        "queries_per_second": len(latencies_ms) / duration,
+        "mean_ms": float(np.mean(latencies_ms)) if latencies_ms else 0.0,
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+    }
+
+
+def run_load_experiment(
+    input_size: int, input_columns: int, options: ExperimentOptions, concurrency: int, duration: float
+) -> dict[str, Any]:
+    """Drive each filter method from concurrent clients during the duration, for each table.
+
+    Each client is a process with its own database connection, like the workers of gunicorn,
+    so that the clients compete for the database and not for the GIL.
+    The inputs are generated before the measured window, so the clients only run the filter queries.
+    """
+    columns = ALL_INPUT_COLUMNS[:input_columns]
+    results: dict[str, Any] = {
+        "input_size": input_size,
+        "columns": columns,
+        "concurrency": concurrency,
+        "duration_s": duration,
+        "fake_inputs_percent": options.fake_inputs_percent,
+        "generator": options.generator,
+        "sampling": options.sampling,
+        "index_variant": options.index_variant,
+        "indexes": options.index_builds,
+        "samples": {},
+    }
+    experiment_methods = ExperimentBase.experiment_methods()
+    if options.reverse_order:
+        experiment_methods.reverse()
+
+    close_connections_before_fork()
+    with ProcessPoolExecutor(max_workers=concurrency, initializer=init_worker_process) as executor:
+        for base_method in experiment_methods:
+            method_name = base_method.__name__
+            for experiment_table in ExperimentBase.submodels_by_size().values():
+                table_name = experiment_table.__name__
+                print(f"Loading {method_name} for {table_name} with {concurrency} clients during {duration} s...")
+                input_sets = [
+                    generate_inputs(experiment_table, input_size, columns, options) for _ in range(LOAD_INPUT_SETS)
+                ]
+                # The inputs were generated on a new connection of the parent
+                close_connections_before_fork()
+
+                start_at = time.monotonic() + LOAD_START_DELAY_SECONDS
+                futures = [
+                    executor.submit(
+                        run_load_worker, table_name, method_name, columns, input_sets, (start_at, start_at + duration)
+                    )
+                    for _ in range(concurrency)
+                ]
+                latencies_ms = [latency for future in futures for latency in future.result()]
+                load_results = summarize_load(latencies_ms, concurrency, duration)
+                print(
+                    f"Load for {method_name}/{table_name}: {load_results['queries_per_second']:.1f} queries/s | "
+                    f"p50={load_results['p50_ms']:.2f} ms | p95={load_results['p95_ms']:.2f} ms | "
+                    f"p99={load_results['p99_ms']:.2f} ms"
+                )
+                results.setdefault(table_name, {})[method_name] = load_results
+                results["samples"].setdefault(table_name, {})[method_name] = latencies_ms
+
+    configuration_id = save_configuration(results, options.results_run_id, "load")
+    if options.json_files:
+        json_filename = f"load_{concurrency}clients_{duration:g}s_{index_variant_tag(options)}{input_size}size_{input_columns}cols.json"
+        save_to_json(results, json_filename)
+        print(f"Results saved to {json_filename}")
+
+    print(
+        f"Load experiments completed. Results saved to {settings.RESULTS_STORE_PATH} (configuration {configuration_id})"
+    )
+    return results
+
+
+def send_filter_requests(url: str, bodies: list[bytes], end_at: float) -> tuple[list[float], int]:
+    """POST the bodies to the filter endpoint in a loop until end_at, on a single kept-alive HTTP connection.
+
+    Return the latency in ms of each successful request, and the number of failed requests.
+    """
+    parsed_url = urlsplit(url)
+    http_connection = http.client.HTTPConnection(parsed_url.netloc)
+    latencies_ms: list[float] = []
+    errors = 0
+    while time.monotonic() < end_at:
+        body = bodies[(len(latencies_ms) + errors) % len(bodies)]
+        start_time = time.perf_counter()
+        try:
+            # Sync gunicorn workers close the connection after each response: it is reopened by the next request
+            http_connection.request("POST", parsed_url.path, body, {"Content-Type": "application/json"})
+            response = http_connection.getresponse()
+            response.read()
+        except (ConnectionError, http.client.HTTPException):
+            http_connection.close()
+            errors += 1
+            continue
+        if response.status == HTTPStatus.OK:
+            latencies_ms.append((time.perf_counter() - start_time) * 1000)
+        else:
+            errors += 1
+
+    http_connection.close()
+    return latencies_ms, errors
+
+
+def run_api_load(url: str, bodies: list[bytes], concurrency: int, duration: float) -> dict[str, float | int]:
+    """Send the bodies to the filter endpoint from concurrent clients during the duration.
+
+    The clients are threads, which only wait on the server, so the server and not the client is measured
+    as long as the client keeps a core free.
+    """
+    end_at = time.monotonic() + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(send_filter_requests, url, bodies, end_at) for _ in range(concurrency)]
+        client_results = [future.result() for future in futures]
+
+    latencies_ms = [latency for client_latencies, _ in client_results for latency in client_latencies]
+    return {
+        **summarize_load(latencies_ms, concurrency, duration),
+        "errors": sum(errors for _, errors in client_results),
+    }
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from experiments.bloom import rebuild_bloom_filters
+from experiments.models import ALL_INPUT_COLUMNS, DEFAULT_BULK_SIZE, ExperimentBase
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the Bloom filters of the rows already in the tables. Filters of new tables are built with their rows. "
+        "Example: python manage.py build_bloom_filters --table-size 5M"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--table-size",
+            nargs="+",
+            choices=list(ExperimentBase.submodels_by_size()),
+            default=list(ExperimentBase.submodels_by_size()),
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BULK_SIZE)
+
+    def handle(self, *args, **options):
+        experiment_tables = ExperimentBase.submodels_by_size()
+        for table_size in options.get("table_size"):
+            experiment_table = experiment_tables[table_size]
+            self.stdout.write(f"Building the Bloom filters of {experiment_table.__name__}...")
+            rebuild_bloom_filters(experiment_table, ALL_INPUT_COLUMNS, options.get("batch_size"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from experiments.columnar import export_columnar_index
+from experiments.models import ALL_INPUT_COLUMNS, DEFAULT_BULK_SIZE, ExperimentBase
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the tables into memory-mapped NumPy files for the columnar filter method. "
+        "Example: python manage.py build_columnar_index --table-size 5M"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--table-size",
+            nargs="+",
+            choices=list(ExperimentBase.submodels_by_size()),
+            default=list(ExperimentBase.submodels_by_size()),
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BULK_SIZE)
+
+    def handle(self, *args, **options):
+        experiment_tables = ExperimentBase.submodels_by_size()
+        for table_size in options.get("table_size"):
+            experiment_table = experiment_tables[table_size]
+            self.stdout.write(f"Exporting {experiment_table.__name__}...")
+            exports = export_columnar_index(experiment_table, ALL_INPUT_COLUMNS, options.get("batch_size"))
+            for index_name, export in exports.items():
+                self.stdout.write(
+                    f"{index_name}: {export['rows']} rows | {export['size_bytes']} bytes | {export['build_ms']:.0f} ms"
+                )
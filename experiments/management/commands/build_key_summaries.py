@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from experiments.models import ALL_INPUT_COLUMNS, ExperimentBase, KeySummary
+from experiments.utils import key_column_prefixes
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarize the rows already in the tables. Summaries of new rows are updated with each inserted batch. "
+        "Example: python manage.py build_key_summaries --table-size 5M"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--table-size",
+            nargs="+",
+            choices=list(ExperimentBase.submodels_by_size()),
+            default=list(ExperimentBase.submodels_by_size()),
+        )
+
+    def handle(self, *args, **options):
+        experiment_tables = ExperimentBase.submodels_by_size()
+        for table_size in options.get("table_size"):
+            experiment_table = experiment_tables[table_size]
+            self.stdout.write(f"Summarizing {experiment_table.__name__}...")
+            KeySummary.rebuild(experiment_table)
+            for columns in key_column_prefixes(ALL_INPUT_COLUMNS):
+                statistics = KeySummary.statistics(experiment_table, columns)
+                self.stdout.write(f"{len(columns)} columns: {statistics}")
@@ -0,0 +1,70 @@
+import os
+
+import orjson
+from django.core.management.base import BaseCommand
+
+from experiments.load import DEFAULT_LOAD_DURATION_SECONDS, LOAD_INPUT_SETS, run_api_load
+from experiments.models import ALL_INPUT_COLUMNS, AUTO_FILTER_STRATEGY, DEFAULT_INPUT_SIZE, ExperimentBase
+from experiments.utils import save_to_json
+
+API_PORT = os.environ.get("API_PORT", "8000")
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test POST /experiments/filter of a running server, e.g. gunicorn with GUNICORN_WORKER_CLASS=sync "
+        "then uvicorn_worker.UvicornWorker. Example: python manage.py load_test_filter_endpoint --label wsgi"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default=f"http://127.0.0.1:{API_PORT}/experiments/filter")
+        parser.add_argument("--label", default="server", help="Name of the serving mode in the results file")
+        parser.add_argument("--table-size", choices=list(ExperimentBase.submodels_by_size()), default="5M")
+        parser.add_argument("--input-size", type=int, default=DEFAULT_INPUT_SIZE)
+        parser.add_argument("--input-columns", type=int, default=2)
+        parser.add_argument(
+            "--strategy",
+            choices=[AUTO_FILTER_STRATEGY, *ExperimentBase.filter_strategies()],
+            default=AUTO_FILTER_STRATEGY,
+        )
+        parser.add_argument("--concurrency", type=int, default=10, help="Number of concurrent clients")
+        parser.add_argument("--duration", type=float, default=DEFAULT_LOAD_DURATION_SECONDS)
+
+    def handle(self, *args, **options):
+        table_size = options.get("table_size")
+        input_size = options.get("input_size")
+        columns = ALL_INPUT_COLUMNS[: options.get("input_columns")]
+        strategy = options.get("strategy")
+        concurrency = options.get("concurrency")
+        duration = options.get("duration")
+
+        # Sample the inputs from the table before the load, so that the requests match rows
+        experiment_table = ExperimentBase.submodels_by_size()[table_size]
+        bodies = [
+            orjson.dumps(
+                {
+                    "table_size": table_size,
+                    "columns": columns,
+                    "inputs": experiment_table.generate_inputs(input_size, columns),
+                    "strategy": strategy,
+                }
+            )
+            for _ in range(LOAD_INPUT_SETS)
+        ]
+
+        self.stdout.write(f"Sending requests to {options['url']} from {concurrency} clients during {duration} s...")
+        results = {
+            "label": options.get("label"),
+            "table_size": table_size,
+            "input_size": input_size,
+            "columns": columns,
+            "strategy": strategy,
+            **run_api_load(options.get("url"), bodies, concurrency, duration),
+        }
+        self.stdout.write(
+            f"{results['queries_per_second']:.1f} requests/s | p50={results['p50_ms']:.2f} ms | "
+            f"p95={results['p95_ms']:.2f} ms | p99={results['p99_ms']:.2f} ms | errors={results['errors']}"
+        )
+        save_to_json(
+            results, f"load_api_{options.get('label')}_{concurrency}clients_{duration:g}s_{input_size}size.json"
+        )
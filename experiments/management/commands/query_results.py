@@ -0,0 +1,65 @@
+import json
+from collections import defaultdict
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from experiments.results_store import DURATION_MEASURE, query_samples
+
+
+def parse_dimension(condition: str) -> tuple[str, object]:
+    """Name and value of a name=value condition, with the value parsed as JSON when it is valid JSON."""
+    name, separator, value = condition.partition("=")
+    if not separator:
+        raise CommandError(f"Conditions are name=value: {condition}")
+    try:
+        return name, json.loads(value)
+    except json.JSONDecodeError:
+        return name, value
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarize the samples of the results store matching the conditions, grouped by dimensions. "
+        "Example: python manage.py query_results --where cache_mode=cold input_size=100 "
+        "--group-by index_variant table_name method_name"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--where",
+            nargs="+",
+            default=[],
+            help="Conditions name=value on the dimensions of the configurations, e.g. sampling=offset, "
+            "or on the samples and runs, e.g. method_name=filter_rows_with_in_tuples or run_id=3",
+        )
+        parser.add_argument(
+            "--measure",
+            default=DURATION_MEASURE,
+            help="Measure of the samples, e.g. phase_timings.compile_ms",
+        )
+        parser.add_argument(
+            "--group-by",
+            nargs="+",
+            default=["table_name", "method_name"],
+            help="Dimensions to group the samples by",
+        )
+
+    def handle(self, *args, **options):
+        group_by = options.get("group_by")
+        samples = query_samples(
+            **dict(parse_dimension(condition) for condition in options.get("where")), measure=options.get("measure")
+        )
+        values_by_group: dict[tuple, list[float]] = defaultdict(list)
+        for sample in samples:
+            group = tuple(sample[name] if name in sample else sample["dimensions"].get(name) for name in group_by)
+            values_by_group[group].append(sample["value"])
+
+        if not values_by_group:
+            self.stdout.write("No samples match the conditions")
+        for group, values in sorted(values_by_group.items(), key=lambda item: str(item[0])):
+            p50, p99 = np.percentile(values, [50, 99])
+            self.stdout.write(
+                " | ".join(f"{name}={value}" for name, value in zip(group_by, group, strict=True))
+                + f" | samples={len(values)} | mean={np.mean(values):.2f} | p50={p50:.2f} | p99={p99:.2f}"
+            )
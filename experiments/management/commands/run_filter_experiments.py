@@ -1,65 +1,27 @@
-import time
+from dataclasses import replace
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
-from experiments.graph import plot_graph
+from experiments.async_runner import DEFAULT_IN_FLIGHT, run_async_experiment
+from experiments.buffers import CACHE_MODES, DEFAULT_CACHE_MODE
+from experiments.cache import DEFAULT_CACHED_INPUT_SETS
+from experiments.indexes import DEFAULT_INDEX_VARIANT, INDEX_VARIANTS, index_variant
+from experiments.load import DEFAULT_LOAD_DURATION_SECONDS, run_load_experiment
 from experiments.models import (
-    ALL_INPUT_COLUMNS,
     DEFAULT_FAKE_INPUTS_PERCENT,
+    DEFAULT_INPUT_SAMPLING,
     DEFAULT_INPUT_SIZE,
     DEFAULT_NUMBER_RUNS,
-    ExperimentBase,
+    DEFAULT_WARMUP_RUNS,
+    INPUT_SAMPLING_MODES,
 )
-from experiments.utils import save_to_json
+from experiments.results_store import start_run
+from experiments.runner import ExperimentOptions, run_experiment
+from experiments.tasks import distribute_experiments
+from experiments.utils import DEFAULT_PROFILE_GENERATOR, PROFILE_GENERATORS
 
-
-def run_experiment(
-    input_size: int,
-    input_columns: int,
-    number_runs: int,
-    fake_inputs_percent: int = DEFAULT_FAKE_INPUTS_PERCENT,
-    reverse_order: bool = False,
-):
-    columns = ALL_INPUT_COLUMNS[:input_columns]
-    results = {
-        "input_size": input_size,
-        "columns": columns,
-        "number_runs": number_runs,
-        "fake_inputs_percent": fake_inputs_percent,
-    }
-    experiment_methods = ExperimentBase.experiment_methods()
-    if reverse_order:
-        experiment_methods.reverse()
-    for base_method in experiment_methods:
-        method_name = base_method.__name__
-        for experiment_table in ExperimentBase.submodels_by_size().values():
-            table_name = experiment_table.__name__
-            print(f"Testing {method_name} for {table_name}...")
-            method = getattr(experiment_table, method_name)
-            total_duration = 0.0
-            for i in range(number_runs):
-                print(f"Run {i + 1}/{number_runs}...")
-                inputs = experiment_table.generate_inputs(input_size, columns, fake_percent=fake_inputs_percent)
-                # Only measure the experiment method
-                start_time = time.perf_counter()
-                method(inputs, columns)
-                total_duration += time.perf_counter() - start_time
-
-            average_duration_ms = (total_duration / number_runs) * 1000
-            print(f"Average runtime for {method_name}/{table_name}: {average_duration_ms:.2f} ms")
-
-            if table_name not in results:
-                results[table_name] = {}
-            results[table_name][method_name] = average_duration_ms  # type: ignore[index]
-
-    # Save final results to JSON
-    json_filename = f"experiments_{number_runs}runs_{fake_inputs_percent}fake_{input_size}size_{input_columns}cols.json"
-    save_to_json(results, json_filename)
-
-    # Generate graph
-    plot_graph(json_filename)
-
-    print(f"Experiments completed. Results saved to {json_filename}")
+INPUT_SIZES = [100, 200, 500, 1000]
+INPUT_COLUMNS = [2, 3, 4]
 
 
 class Command(BaseCommand):
@@ -69,16 +31,181 @@ class Command(BaseCommand):
         parser.add_argument("--input-size", type=int, default=DEFAULT_INPUT_SIZE)
         parser.add_argument("--input-columns", type=int, default=2)
         parser.add_argument("--number-runs", type=int, default=DEFAULT_NUMBER_RUNS)
+        parser.add_argument("--warmup-runs", type=int, default=DEFAULT_WARMUP_RUNS, help="Runs not recorded")
         parser.add_argument("--fake-inputs-percent", type=int, default=DEFAULT_FAKE_INPUTS_PERCENT)
         parser.add_argument("--reverse-order", action="store_true", default=False)
+        parser.add_argument("--generator", choices=PROFILE_GENERATORS, default=DEFAULT_PROFILE_GENERATOR)
+        parser.add_argument("--sampling", choices=INPUT_SAMPLING_MODES, default=DEFAULT_INPUT_SAMPLING)
+        parser.add_argument(
+            "--explain", action="store_true", default=False, help="Save EXPLAIN (ANALYZE, BUFFERS) plans of each method"
+        )
+        parser.add_argument(
+            "--cache-mode",
+            choices=CACHE_MODES,
+            default=DEFAULT_CACHE_MODE,
+            help="warm: prewarm the table and indexes, cold: evict them before each run, as-is: leave caches alone",
+        )
+        parser.add_argument(
+            "--evict-command",
+            default=None,
+            help="Shell command run before each run in cold mode, e.g. to drop the OS page cache of the database host",
+        )
+        parser.add_argument(
+            "--cache-results",
+            action="store_true",
+            default=False,
+            help="Serve the results of the in_tuples and conditions methods from Redis, keyed by the set of inputs",
+        )
+        parser.add_argument(
+            "--cached-input-sets",
+            type=int,
+            default=DEFAULT_CACHED_INPUT_SETS,
+            help="With --cache-results, number of input sets replayed across the runs of each method and table. "
+            "With N sets, runs after the first N hit the cache",
+        )
+        parser.add_argument(
+            "--connection-timing",
+            action="store_true",
+            default=False,
+            help="Reconnect before each run and report connection setup, planning and execution times. "
+            "Compare EXPERIMENTS_DB_CONNECTION_PROFILE=direct and pooled",
+        )
+        parser.add_argument(
+            "--bloom-prefilter",
+            action="store_true",
+            default=False,
+            help="Measure each method again with the inputs absent from the Bloom filters of the tables dropped "
+            "before the query, and report the inputs dropped and the latency saved",
+        )
+        parser.add_argument(
+            "--columnar",
+            action="store_true",
+            default=False,
+            help="Also measure the in-process columnar engine, exported by the build_columnar_index command",
+        )
+        parser.add_argument(
+            "--phases",
+            action="store_true",
+            default=False,
+            help="Split the duration of each run into Python, SQL compile and execution time, "
+            "with the SQL text length and number of bind parameters of its queries",
+        )
+        parser.add_argument(
+            "--orm-phases",
+            action="store_true",
+            default=False,
+            help="Also time the queryset build, SQL compile and execution of the ORM methods separately",
+        )
+        parser.add_argument(
+            "--key-summary",
+            action="store_true",
+            default=False,
+            help="Also measure the method reading the per-key summaries of age, and report their shrink factor "
+            "and speedup over in_tuples",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=None,
+            help="Load mode: drive each method from N concurrent clients instead of timing single runs",
+        )
+        parser.add_argument(
+            "--duration",
+            type=float,
+            default=DEFAULT_LOAD_DURATION_SECONDS,
+            help="Duration in seconds of each load in load mode",
+        )
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            default=False,
+            help="Send one Celery task per cell of the matrix to the workers, aggregated with a chord",
+        )
+        parser.add_argument(
+            "--async",
+            action="store_true",
+            default=False,
+            dest="use_async",
+            help="Run the async variants of the methods on psycopg async connections",
+        )
+        parser.add_argument(
+            "--in-flight",
+            type=int,
+            default=DEFAULT_IN_FLIGHT,
+            help="Async mode: number of queries sent at once from the event loop",
+        )
+        parser.add_argument(
+            "--json-files",
+            action="store_true",
+            default=False,
+            help="Also save each configuration to its own JSON file with its graph, in addition to the results store",
+        )
+        parser.add_argument(
+            "--index-variants",
+            nargs="+",
+            choices=INDEX_VARIANTS,
+            default=[DEFAULT_INDEX_VARIANT],
+            help="Run the experiments once per variant of extra indexes, created concurrently on all tables "
+            "before its runs and dropped after them",
+        )
 
     def handle(self, *args, **options):
         input_size = options.get("input_size")
         input_columns = options.get("input_columns")
-        number_runs = options.get("number_runs")
-        fake_inputs_percent = options.get("fake_inputs_percent")
-        reverse_order = options.get("reverse_order")
+        experiment_options = ExperimentOptions(
+            number_runs=options.get("number_runs"),
+            warmup_runs=options.get("warmup_runs"),
+            fake_inputs_percent=options.get("fake_inputs_percent"),
+            reverse_order=options.get("reverse_order"),
+            generator=options.get("generator"),
+            sampling=options.get("sampling"),
+            explain=options.get("explain"),
+            cache_mode=options.get("cache_mode"),
+            evict_command=options.get("evict_command"),
+            cache_results=options.get("cache_results"),
+            cached_input_sets=options.get("cached_input_sets"),
+            connection_timing=options.get("connection_timing"),
+            bloom_prefilter=options.get("bloom_prefilter"),
+            columnar=options.get("columnar"),
+            key_summary=options.get("key_summary"),
+            orm_phases=options.get("orm_phases"),
+            phases=options.get("phases"),
+            json_files=options.get("json_files"),
+        )
+        if experiment_options.cached_input_sets < 1:
+            raise CommandError("--cached-input-sets must be at least 1")
+        if experiment_options.cache_mode == "cold" and not experiment_options.evict_command:
+            self.stderr.write(
+                "Cold mode without --evict-command only evicts shared_buffers (PostgreSQL 17+), not the OS page cache"
+            )
+
+        concurrency = options.get("concurrency")
+        duration = options.get("duration")
+        use_async = options.get("use_async")
+        in_flight = options.get("in_flight")
+        index_variants = options.get("index_variants")
+
+        if options.get("celery"):
+            if index_variants != [DEFAULT_INDEX_VARIANT]:
+                raise CommandError("Index variants are dropped after their runs, which Celery runs asynchronously")
+            result = distribute_experiments(INPUT_SIZES, INPUT_COLUMNS, experiment_options)
+            self.stdout.write(
+                f"Experiments sent to the Celery workers. Results are saved by the chord task {result.id}"
+            )
+            return
 
-        for input_size in [100, 200, 500, 1000]:
-            for input_columns in [2, 3, 4]:
-                run_experiment(input_size, input_columns, number_runs, fake_inputs_percent, reverse_order)
+        # All the configurations of the command are saved to the same run of the results store
+        kind = "load" if concurrency else "async" if use_async else "sync"
+        experiment_options = replace(experiment_options, results_run_id=start_run(kind))
+        for variant in index_variants:
+            # Indexes are built once per variant for all the configurations
+            with index_variant(variant) as index_builds:
+                variant_options = replace(experiment_options, index_variant=variant, index_builds=index_builds)
+                for input_size in INPUT_SIZES:
+                    for input_columns in INPUT_COLUMNS:
+                        if concurrency:
+                            run_load_experiment(input_size, input_columns, variant_options, concurrency, duration)
+                        elif use_async:
+                            run_async_experiment(input_size, input_columns, variant_options, in_flight)
+                        else:
+                            run_experiment(input_size, input_columns, variant_options)
@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("experiments", "0004_experiment50m"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GenerationRange",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("table_name", models.CharField(max_length=255)),
+                ("range_start", models.BigIntegerField()),
+                ("range_end", models.BigIntegerField()),
+                ("rows_generated", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("table_name", "range_start"), name="unique_generation_range")
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2 on 2026-10-18 19:39
+
+from django.conf import settings
+from django.db import migrations, models
+
+TABLE_NAME = "experiments_experiment50mhash"
+
+# Partitioned tables need a primary key including the partition key, which Django cannot create.
+# Identity columns of partitioned tables need PostgreSQL 17, so the id is drawn from a bigserial sequence.
+CREATE_PARTITIONED_TABLE_SQL = (
+    f"""
+    CREATE TABLE "{TABLE_NAME}" (
+        "id" bigserial NOT NULL,
+        "first_name" varchar(255) NOT NULL,
+        "last_name" varchar(255) NOT NULL,
+        "age" integer NOT NULL,
+        "email" varchar(255) NULL,
+        "created_at" timestamp with time zone NOT NULL,
+        PRIMARY KEY ("id", "first_name", "last_name")
+    ) PARTITION BY HASH ("first_name", "last_name")
+    """,
+    *(
+        f'CREATE TABLE "{TABLE_NAME}_p{remainder}" PARTITION OF "{TABLE_NAME}" '
+        f"FOR VALUES WITH (MODULUS {settings.EXPERIMENTS_PARTITION_COUNT}, REMAINDER {remainder})"
+        for remainder in range(settings.EXPERIMENTS_PARTITION_COUNT)
+    ),
+    # Indexes created by Django for the fields and Meta.indexes of the model, built on each partition
+    f'CREATE INDEX "experiments_experiment50mhash_first_name_bd21a6ad" ON "{TABLE_NAME}" ("first_name")',
+    f'CREATE INDEX "experiments_experiment50mhash_first_name_bd21a6ad_like" ON "{TABLE_NAME}" '
+    '("first_name" varchar_pattern_ops)',
+    f'CREATE INDEX "experiments_experiment50mhash_last_name_53f4c80a" ON "{TABLE_NAME}" ("last_name")',
+    f'CREATE INDEX "experiments_experiment50mhash_last_name_53f4c80a_like" ON "{TABLE_NAME}" '
+    '("last_name" varchar_pattern_ops)',
+    f'CREATE INDEX "experiments_experiment50mhash_age_f14f6928" ON "{TABLE_NAME}" ("age")',
+    f'CREATE INDEX "experiment50mhash_name_index" ON "{TABLE_NAME}" ("first_name", "last_name")',
+)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("experiments", "0005_generationrange"),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CREATE_PARTITIONED_TABLE_SQL, reverse_sql=f'DROP TABLE "{TABLE_NAME}"'),
+            ],
+            state_operations=[
+                migrations.CreateModel(
+                    name="Experiment50MHash",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+                            ),
+                        ),
+                        ("first_name", models.CharField(db_index=True, max_length=255)),
+                        ("last_name", models.CharField(db_index=True, max_length=255)),
+                        ("age", models.IntegerField(db_index=True)),
+                        ("email", models.EmailField(blank=True, max_length=255, null=True)),
+                        ("created_at", models.DateTimeField(auto_now_add=True)),
+                    ],
+                    options={
+                        "abstract": False,
+                        "indexes": [
+                            models.Index(fields=["first_name", "last_name"], name="experiment50mhash_name_index")
+                        ],
+                    },
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 19:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("experiments", "0006_experiment50mhash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="KeySummary",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("table_name", models.CharField(max_length=255)),
+                ("number_of_columns", models.PositiveSmallIntegerField()),
+                ("first_name", models.CharField(max_length=255)),
+                ("last_name", models.CharField(max_length=255)),
+                ("age", models.IntegerField(null=True)),
+                ("email", models.EmailField(max_length=255, null=True)),
+                ("sum_age", models.BigIntegerField()),
+                ("count", models.BigIntegerField()),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("table_name", "number_of_columns", "first_name", "last_name", "age", "email"),
+                        name="unique_key_summary",
+                        nulls_distinct=False,
+                    )
+                ],
+            },
+        ),
+    ]
@@ -1,25 +1,73 @@
 import logging
+import math
 import random
 import time
-from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache
+from typing import TYPE_CHECKING, Any, Callable
 
-from django.db import models
-from django.db.models import Avg, BooleanField, Q
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, models, transaction
+from django.db.models import Avg, BooleanField, Count, Min, Q, Sum
 from django.db.models.expressions import RawSQL
 from django.db.models.fields.tuple_lookups import Tuple, TupleIn
-
-from experiments.utils import generate_fake_profile, generate_random_inputs, timeit
+from django.db.models.options import Options
+from django.utils import timezone
+
+from experiments.bloom import add_to_bloom_filters, create_bloom_filters, discard_bloom_filters
+from experiments.cache import invalidate_table_if_reachable
+from experiments.columnar import ColumnarIndex
+from experiments.utils import (
+    DEFAULT_PROFILE_GENERATOR,
+    PROFILE_GENERATORS,
+    FakeProfileGenerator,
+    generate_random_inputs,
+    iter_fake_profiles,
+    key_column_prefixes,
+    numeric_average,
+    timeit,
+)
+
+if TYPE_CHECKING:
+    from psycopg import AsyncConnection
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_INPUT_SIZE = 100
 DEFAULT_NUMBER_RUNS = 2
+DEFAULT_WARMUP_RUNS = 1
 DEFAULT_BULK_SIZE = 10_000
 DEFAULT_FAKE_INPUTS_PERCENT = 10
 ALL_INPUT_COLUMNS = ["first_name", "last_name", "age", "email"]
+TEMP_INPUTS_TABLE = "experiment_inputs"
+INPUT_SAMPLING_MODES = ["offset", "pk_range", "tablesample"]
+DEFAULT_INPUT_SAMPLING = "pk_range"
+TABLESAMPLE_OVERSAMPLING = 2
+BULK_ENGINES = ["orm", "copy"]
+DEFAULT_BULK_ENGINE = "orm"
+FILTER_METHOD_PREFIX = "filter_rows_with_"
+AUTO_FILTER_STRATEGY = "auto"
+DEFAULT_PARALLEL_CHUNKS = 4
+# Queryset builder of each experiment method filtering with the ORM, whose phases can be timed separately
+ORM_QUERYSET_BUILDERS = {
+    "filter_rows_with_in_tuples": "_in_tuples_queryset",
+    "filter_rows_with_conditions": "_conditions_queryset",
+}
+# The auto strategy sends short lists of inputs inline, and longer ones as arrays to keep the SQL text constant
+AUTO_STRATEGY_MAX_INLINE_INPUTS = 100
+
+
+class FieldsByNameMixin:
+    _meta: Options
+
+    @classmethod
+    @cache
+    def _fields_by_name(cls) -> dict[str, models.Field]:
+        """Fields of the model by name, e.g. for the database types of the arrays of raw queries."""
+        return {field.name: field for field in cls._meta.fields}
 
 
-class ExperimentBase(models.Model):
+class ExperimentBase(FieldsByNameMixin, models.Model):
     first_name = models.CharField(max_length=255, db_index=True)
     last_name = models.CharField(max_length=255, db_index=True)
     age = models.IntegerField(db_index=True)
@@ -36,6 +84,8 @@ class ExperimentBase(models.Model):
 
     # Must be set by subclass
     _max_count = -1
+    # Hash-partitioned on (first_name, last_name) by the migration of the subclass
+    _partitioned = False
 
     @classmethod
     def submodels_by_size(cls) -> dict[str, type["ExperimentBase"]]:
@@ -44,6 +94,8 @@ class ExperimentBase(models.Model):
             if submodel._max_count == -1:
                 continue
             key = f"{submodel._max_count // 1_000_000}M"
+            if submodel._partitioned:
+                key += "-hash"
             submodels[key] = submodel
 
         return submodels
@@ -76,46 +128,223 @@ class ExperimentBase(models.Model):
         return [
             cls.filter_rows_with_in_tuples,
             cls.filter_rows_with_conditions,
+            cls.filter_rows_with_values_join,
+            cls.filter_rows_with_temp_table,
+            cls.filter_rows_with_unnest_arrays,
+            cls.filter_rows_with_parallel_chunks,
+        ]
+
+    @classmethod
+    def filter_strategies(cls) -> list[str]:
+        """Names of the experiment, columnar and key summary methods without their prefix, e.g. in_tuples."""
+        return [
+            method.__name__.removeprefix(FILTER_METHOD_PREFIX)
+            for method in [*cls.experiment_methods(), cls.filter_rows_with_columnar, cls.filter_rows_with_key_summary]
+        ]
+
+    @classmethod
+    def filter_rows(
+        cls, inputs: list[tuple], input_columns: list[str], strategy: str = AUTO_FILTER_STRATEGY
+    ) -> tuple[float | None, str]:
+        """Return the average age of the rows matching the inputs with the strategy, and the strategy used.
+
+        :param strategy: one of filter_strategies(), or "auto" to choose it from the number of inputs.
+        """
+        if strategy == AUTO_FILTER_STRATEGY:
+            strategy = "in_tuples" if len(inputs) <= AUTO_STRATEGY_MAX_INLINE_INPUTS else "unnest_arrays"
+        strategies = cls.filter_strategies()
+        if strategy not in strategies:
+            raise ValueError(f"Unknown filter strategy: {strategy}. Available: {[AUTO_FILTER_STRATEGY, *strategies]}")
+
+        method = getattr(cls, f"{FILTER_METHOD_PREFIX}{strategy}")
+        return method(inputs, input_columns), strategy
+
+    @classmethod
+    def async_experiment_methods(cls) -> list[Callable]:
+        """Async variants of the single connection experiment methods, run on a psycopg AsyncConnection."""
+        return [
+            cls.afilter_rows_with_in_tuples,
+            cls.afilter_rows_with_conditions,
+            cls.afilter_rows_with_values_join,
+            cls.afilter_rows_with_temp_table,
+            cls.afilter_rows_with_unnest_arrays,
         ]
 
     @classmethod
-    def bulk_generate_rows(cls, number_of_rows: int | None = None, bulk_size: int = DEFAULT_BULK_SIZE) -> None:
+    def bulk_generate_rows(  # noqa: PLR0913
+        cls,
+        number_of_rows: int | None = None,
+        bulk_size: int = DEFAULT_BULK_SIZE,
+        engine: str = DEFAULT_BULK_ENGINE,
+        generator: str = DEFAULT_PROFILE_GENERATOR,
+        seed: int | None = None,
+        key_summaries: bool = True,
+        bloom_filters: bool = True,
+    ) -> None:
         """Generate rows in bulk until the table reach its maximum number of rows.
 
         :param number_of_rows: limit the number of rows to generate if provided.
         :param bulk_size: customizable bulk size for each creation.
+        :param engine: "orm" to insert model instances with bulk_create, "copy" to stream rows with COPY FROM STDIN.
+        :param generator: "faker" to generate each profile with Faker, "numpy" to draw whole batches at once.
+        :param seed: optional seed of the profile generator.
+        :param key_summaries: update the key summaries of the table with each batch, or discard them.
+        :param bloom_filters: update the Bloom filters of the table with each batch, or discard them.
+            The filters are only created with the first rows of the table, to hold all its rows.
         """
+        if not key_summaries:
+            KeySummary.discard(cls)
         current_count = cls.objects.count()
+        if not bloom_filters:
+            discard_bloom_filters(cls, ALL_INPUT_COLUMNS)
+        elif not current_count:
+            create_bloom_filters(cls, ALL_INPUT_COLUMNS)
         max_rows_to_create = cls._max_count - current_count
         number_of_rows = number_of_rows or max_rows_to_create
         number_to_create = min(number_of_rows, max_rows_to_create)
-        logger.info(f"Generating rows for {cls.__name__}: {current_count=} | {number_to_create=}")
-        while number_to_create > 0:
-            bulk_size = min(number_to_create, bulk_size)
-            cls.objects.bulk_create([cls(**generate_fake_profile()) for _ in range(bulk_size)])
-            number_to_create -= bulk_size
-            logger.info(f"Number to create remaining: {number_to_create}")
+        logger.info(f"Generating rows for {cls.__name__}: {current_count=} | {number_to_create=} | {engine=}")
+        number_created = 0
+        start_time = time.perf_counter()
+        try:
+            for profiles in iter_fake_profiles(number_to_create, bulk_size, generator, seed):
+                # The key summaries are committed with their rows
+                with transaction.atomic():
+                    cls.insert_profiles(profiles, engine, key_summaries, bloom_filters)
+                number_created += len(profiles)
+                logger.info(f"Number to create remaining: {number_to_create - number_created}")
+        finally:
+            # Once per load rather than per batch, as cached results are not read while rows are generated,
+            # and even when a batch fails after others were committed
+            invalidate_table_if_reachable(cls)
+
+        duration = time.perf_counter() - start_time
+        rows_per_second = number_created / duration if duration else 0.0
+        logger.info(
+            f"Generated {number_created} rows for {cls.__name__} in {duration:.2f} s ({rows_per_second:.0f} rows/s)"
+        )
+
+    @classmethod
+    def insert_profiles(
+        cls,
+        profiles: list[dict],
+        engine: str = DEFAULT_BULK_ENGINE,
+        key_summaries: bool = True,
+        bloom_filters: bool = True,
+    ) -> None:
+        """Insert a batch of profiles, and add them to the key summaries and existing Bloom filters of the table.
+
+        Run it in a transaction, so that the key summaries are committed with the rows.
+        """
+        if engine not in BULK_ENGINES:
+            raise ValueError(f"Unknown bulk engine: {engine}. Available engines: {BULK_ENGINES}")
+
+        if engine == "copy":
+            cls._copy_profiles(profiles)
+        else:
+            cls.objects.bulk_create([cls(**profile) for profile in profiles])
+        if key_summaries:
+            KeySummary.add_profiles(cls, profiles)
+        if bloom_filters:
+            add_to_bloom_filters(cls, profiles, ALL_INPUT_COLUMNS)
+
+    @classmethod
+    def _copy_profiles(cls, profiles: list[dict]) -> None:
+        """Stream the profiles with COPY FROM STDIN, without building model instances."""
+        created_at = timezone.now()  # Set by auto_now_add with bulk_create
+        columns = ", ".join(connection.ops.quote_name(column) for column in [*ALL_INPUT_COLUMNS, "created_at"])
+        table_name = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor, cursor.copy(f"COPY {table_name} ({columns}) FROM STDIN") as copy:
+            for profile in profiles:
+                copy.write_row([*(profile[column] for column in ALL_INPUT_COLUMNS), created_at])
 
     @classmethod
-    def generate_inputs(
+    def generate_inputs(  # noqa: PLR0913
         cls,
         number_of_inputs: int = DEFAULT_INPUT_SIZE,
         columns: list[str] | None = None,
         max_offset: int | None = None,
         fake_percent: int = DEFAULT_FAKE_INPUTS_PERCENT,
+        generator: str = DEFAULT_PROFILE_GENERATOR,
+        sampling: str = DEFAULT_INPUT_SAMPLING,
     ) -> list[tuple[str, str]]:
+        """Generate inputs mixing rows sampled from the table and fake profiles.
+
+        :param max_offset: only sample among the first rows of the table if provided.
+        :param sampling: "offset" to slice the table at a random OFFSET, which scans up to max_offset rows,
+            "pk_range" to read consecutive rows from a random primary key,
+            "tablesample" to read random blocks with TABLESAMPLE SYSTEM.
+        """
+        if generator not in PROFILE_GENERATORS:
+            raise ValueError(f"Unknown profile generator: {generator}. Available generators: {PROFILE_GENERATORS}")
+        if sampling not in INPUT_SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling mode: {sampling}. Available modes: {INPUT_SAMPLING_MODES}")
+
         columns = columns or ["first_name", "last_name"]
         number_fake_inputs = int(number_of_inputs * fake_percent / 100)
-        fake_inputs = generate_random_inputs(number_fake_inputs, columns)
+        profile_generator = FakeProfileGenerator() if generator == "numpy" else None
+        fake_inputs = generate_random_inputs(number_fake_inputs, columns, profile_generator)
 
         # Get inputs from the database
         number_real_inputs = number_of_inputs - number_fake_inputs
         max_offset = max_offset or cls._max_count
-        random_offset = random.randint(0, max_offset - number_real_inputs)
-        real_inputs = cls.objects.values_list(*columns)[random_offset : random_offset + number_real_inputs]
+        if sampling == "offset":
+            random_offset = random.randint(0, max(0, max_offset - number_real_inputs))
+            real_inputs = list(cls.objects.values_list(*columns)[random_offset : random_offset + number_real_inputs])
+        elif sampling == "pk_range":
+            real_inputs = cls._sample_pk_range(number_real_inputs, columns, max_offset)
+        else:
+            real_inputs = cls._sample_blocks(number_real_inputs, columns, max_offset)
 
         # Combine real and fake inputs
-        return list(real_inputs) + list(fake_inputs)
+        return real_inputs + list(fake_inputs)
+
+    @classmethod
+    def _sample_pk_range(cls, number_of_inputs: int, columns: list[str], max_offset: int) -> list[tuple]:
+        """Read consecutive rows from a random primary key, with index scans only."""
+        first_pk = cls.objects.aggregate(Min("pk"))["pk__min"]
+        if first_pk is None:
+            return []
+
+        random_pk = first_pk + random.randint(0, max(0, max_offset - number_of_inputs))
+        return list(cls.objects.filter(pk__gte=random_pk).order_by("pk").values_list(*columns)[:number_of_inputs])
+
+    @classmethod
+    def _sample_blocks(cls, number_of_inputs: int, columns: list[str], max_offset: int) -> list[tuple]:
+        """Read random blocks of the table with TABLESAMPLE SYSTEM, sized from the estimated number of rows.
+
+        Equivalent SQL:
+
+        SELECT first_name, last_name
+        FROM experiments TABLESAMPLE SYSTEM (0.0004)
+        WHERE id < 12345 + 50000000
+        ORDER BY random()
+        LIMIT 100;
+        """
+        first_pk = cls.objects.aggregate(Min("pk"))["pk__min"]
+        if first_pk is None:
+            return []
+
+        table_name = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [table_name])
+            estimated_rows = cursor.fetchone()[0]
+            # The table has never been analyzed when reltuples is -1
+            sampled_rows = min(max_offset, int(estimated_rows)) if estimated_rows > 0 else max_offset
+            percent = min(100.0, 100.0 * TABLESAMPLE_OVERSAMPLING * number_of_inputs / max(sampled_rows, 1))
+            cursor.execute(
+                f"SELECT {', '.join(connection.ops.quote_name(column) for column in columns)} "
+                f"FROM {table_name} TABLESAMPLE SYSTEM (%s) "
+                f"WHERE {connection.ops.quote_name(cls._meta.pk.column)} < %s "
+                "ORDER BY random() LIMIT %s",
+                [percent, first_pk + max_offset, number_of_inputs],
+            )
+            sampled_inputs = cursor.fetchall()
+
+        # Small tables have too few blocks to sample from: complete with consecutive rows
+        if len(sampled_inputs) < number_of_inputs:
+            sampled_inputs += cls._sample_pk_range(number_of_inputs - len(sampled_inputs), columns, max_offset)
+
+        return sampled_inputs
 
     @classmethod
     def filter_rows_with_conditions(cls, inputs: list[tuple], input_columns: list[str]) -> float:
@@ -131,14 +360,33 @@ class ExperimentBase(models.Model):
             ...
         ;
         """
-        conditions = Q()
-        for input_tuple in inputs:
-            conditions |= Q(**dict(zip(input_columns, input_tuple, strict=True)))
-
-        query = cls.objects.filter(conditions)
+        query = cls._conditions_queryset(inputs, input_columns)
         average_age = query.aggregate(Avg("age"))["age__avg"]
         return average_age
 
+    @classmethod
+    async def afilter_rows_with_conditions(
+        cls, aconnection: "AsyncConnection", inputs: list[tuple], input_columns: list[str]
+    ) -> float | None:
+        return await cls._afetch_aggregate(aconnection, cls._conditions_queryset(inputs, input_columns))
+
+    @classmethod
+    def _conditions_queryset(cls, inputs: list[tuple], input_columns: list[str]) -> models.QuerySet:
+        if not inputs:
+            # An empty OR would not filter any row out
+            return cls.objects.none()
+
+        return cls.objects.filter(cls._conditions(inputs, input_columns))
+
+    @classmethod
+    def _conditions(cls, inputs: list[tuple], input_columns: list[str]) -> Q:
+        """Build the flat OR of the AND conditions of the inputs in one pass.
+
+        Combining the conditions with |= copies the children of the OR at each input, in quadratic time.
+        The lookups are sorted by column like the keyword arguments of Q, so the SQL is the same.
+        """
+        return Q(*(Q(*sorted(zip(input_columns, input_tuple, strict=True))) for input_tuple in inputs), _connector=Q.OR)
+
     @classmethod
     def filter_rows_with_in_tuples(cls, inputs: list[tuple], input_columns: list[str]) -> float:
         """
@@ -154,10 +402,313 @@ class ExperimentBase(models.Model):
             ...
         );
         """
-        query = cls.objects.filter(TupleIn(Tuple(*input_columns), inputs))
+        query = cls._in_tuples_queryset(inputs, input_columns)
         average_age = query.aggregate(Avg("age"))["age__avg"]
         return average_age
 
+    @classmethod
+    async def afilter_rows_with_in_tuples(
+        cls, aconnection: "AsyncConnection", inputs: list[tuple], input_columns: list[str]
+    ) -> float | None:
+        return await cls._afetch_aggregate(aconnection, cls._in_tuples_queryset(inputs, input_columns))
+
+    @classmethod
+    def _in_tuples_queryset(cls, inputs: list[tuple], input_columns: list[str]) -> models.QuerySet:
+        return cls.objects.filter(TupleIn(Tuple(*input_columns), inputs))
+
+    @classmethod
+    def filter_rows_with_values_join(cls, inputs: list[tuple], input_columns: list[str]) -> float | None:
+        """
+        Equivalent SQL:
+
+        SELECT AVG(t.age)
+        FROM experiments AS t
+        INNER JOIN (
+            SELECT DISTINCT * FROM (VALUES ('John', 'Doe'), ('Jane', 'Doe'), ...) AS v (first_name, last_name)
+        ) AS i ON t.first_name = i.first_name AND t.last_name = i.last_name;
+
+        The inputs are deduplicated so that each matching row is counted once, as with the IN filters.
+        """
+        if not inputs:
+            return None
+
+        return cls._fetch_average_age(*cls._values_join_query(inputs, input_columns))
+
+    @classmethod
+    async def afilter_rows_with_values_join(
+        cls, aconnection: "AsyncConnection", inputs: list[tuple], input_columns: list[str]
+    ) -> float | None:
+        if not inputs:
+            return None
+
+        return await cls._afetch_average_age(aconnection, *cls._values_join_query(inputs, input_columns))
+
+    @classmethod
+    def _values_join_query(cls, inputs: list[tuple], input_columns: list[str]) -> tuple[str, list]:
+        row_placeholder = f"({', '.join(['%s'] * len(input_columns))})"
+        values_sql = f"(VALUES {', '.join([row_placeholder] * len(inputs))})"
+        params = [value for input_tuple in inputs for value in input_tuple]
+        return cls._join_inputs_sql(values_sql, input_columns), params
+
+    @classmethod
+    def filter_rows_with_temp_table(cls, inputs: list[tuple], input_columns: list[str]) -> float | None:
+        """
+        Equivalent SQL:
+
+        CREATE TEMPORARY TABLE experiment_inputs (first_name varchar(255), last_name varchar(255));
+        COPY experiment_inputs (first_name, last_name) FROM STDIN;
+        ANALYZE experiment_inputs;
+        SELECT AVG(t.age)
+        FROM experiments AS t
+        INNER JOIN (SELECT DISTINCT * FROM experiment_inputs) AS i
+            ON t.first_name = i.first_name AND t.last_name = i.last_name;
+        DROP TABLE experiment_inputs;
+
+        The inputs are streamed with COPY, so the query text and its number of parameters
+        stay the same whatever the number of inputs.
+        """
+        create_sql, copy_sql, table_name = cls._temp_table_sql(input_columns)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(create_sql)
+                # COPY runs on the psycopg cursor: its errors are raised as the Django errors of the queries
+                with connection.wrap_database_errors, cursor.copy(copy_sql) as copy:
+                    for input_tuple in inputs:
+                        copy.write_row(input_tuple)
+                cursor.execute(f"ANALYZE {table_name}")
+
+            average_age = cls._fetch_average_age(cls._join_inputs_sql(table_name, input_columns))
+
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE {table_name}")
+
+        return average_age
+
+    @classmethod
+    async def afilter_rows_with_temp_table(
+        cls, aconnection: "AsyncConnection", inputs: list[tuple], input_columns: list[str]
+    ) -> float | None:
+        create_sql, copy_sql, table_name = cls._temp_table_sql(input_columns)
+        async with aconnection.transaction():
+            async with aconnection.cursor() as cursor:
+                await cursor.execute(create_sql)
+                async with cursor.copy(copy_sql) as copy:
+                    for input_tuple in inputs:
+                        await copy.write_row(input_tuple)
+                await cursor.execute(f"ANALYZE {table_name}")
+
+            average_age = await cls._afetch_average_age(aconnection, cls._join_inputs_sql(table_name, input_columns))
+
+            async with aconnection.cursor() as cursor:
+                await cursor.execute(f"DROP TABLE {table_name}")
+
+        return average_age
+
+    @classmethod
+    def _temp_table_sql(cls, input_columns: list[str]) -> tuple[str, str, str]:
+        """Return the CREATE and COPY statements of the temporary table of inputs, and its quoted name."""
+        table_name = connection.ops.quote_name(TEMP_INPUTS_TABLE)
+        columns = [connection.ops.quote_name(column) for column in input_columns]
+        column_definitions = ", ".join(
+            f"{column} {db_type}" for column, db_type in zip(columns, cls._db_types(input_columns), strict=True)
+        )
+        return (
+            f"CREATE TEMPORARY TABLE {table_name} ({column_definitions})",
+            f"COPY {table_name} ({', '.join(columns)}) FROM STDIN",
+            table_name,
+        )
+
+    @classmethod
+    def filter_rows_with_unnest_arrays(cls, inputs: list[tuple], input_columns: list[str]) -> float | None:
+        """
+        Equivalent SQL:
+
+        SELECT AVG(age)
+        FROM experiments
+        WHERE (first_name, last_name) IN (
+            SELECT * FROM unnest(
+                '{John,Jane,John,Jane}'::varchar(255)[],
+                '{Doe,Doe,Smith,Smith}'::varchar(255)[]
+            )
+        );
+
+        Each column is sent as a single array parameter, so the SQL text only depends on the columns.
+        Plans can be reused by server-side prepared statements when server_side_binding is enabled.
+        """
+        return cls._fetch_average_age(*cls._unnest_arrays_query(inputs, input_columns))
+
+    @classmethod
+    async def afilter_rows_with_unnest_arrays(
+        cls, aconnection: "AsyncConnection", inputs: list[tuple], input_columns: list[str]
+    ) -> float | None:
+        return await cls._afetch_average_age(aconnection, *cls._unnest_arrays_query(inputs, input_columns))
+
+    @classmethod
+    def filter_rows_with_parallel_chunks(
+        cls, inputs: list[tuple], input_columns: list[str], number_of_chunks: int = DEFAULT_PARALLEL_CHUNKS
+    ) -> float | None:
+        """
+        Equivalent SQL, run for each chunk of the inputs on its own connection, from a pool of threads:
+
+        SELECT SUM(age), COUNT(*)
+        FROM experiments
+        WHERE (first_name, last_name) IN (
+            SELECT * FROM unnest('{John,Jane}'::varchar(255)[], '{Doe,Doe}'::varchar(255)[])
+        );
+
+        The inputs are deduplicated before being split, so that a row matches a single chunk.
+        The sums and counts are merged with the same numeric division as AVG, so the result is identical.
+        Each thread opens its own connection, or takes one from the pool, and releases it when the chunk is done.
+        """
+        unique_inputs = list(dict.fromkeys(inputs))
+        if not unique_inputs:
+            return None
+
+        chunk_size = math.ceil(len(unique_inputs) / number_of_chunks)
+        chunks = [unique_inputs[i : i + chunk_size] for i in range(0, len(unique_inputs), chunk_size)]
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            sums_and_counts = list(
+                executor.map(lambda chunk: cls._sum_and_count_in_thread(chunk, input_columns), chunks)
+            )
+
+        total_age = sum(chunk_sum or 0 for chunk_sum, _ in sums_and_counts)
+        count = sum(chunk_count for _, chunk_count in sums_and_counts)
+        return float(numeric_average(total_age, count)) if count else None
+
+    @classmethod
+    def filter_rows_with_columnar(cls, inputs: list[tuple], input_columns: list[str]) -> float | None:
+        """Answer from the memory-mapped export of the build_columnar_index command, without the database.
+
+        The export is a snapshot: rows written to the table after it are not counted until it is built again.
+        Raise FileNotFoundError if the table was not exported.
+        """
+        return ColumnarIndex.open(cls, input_columns).average_age(inputs)
+
+    @classmethod
+    def filter_rows_with_key_summary(cls, inputs: list[tuple], input_columns: list[str]) -> float | None:
+        """
+        Equivalent SQL:
+
+        SELECT SUM(sum_age) / SUM(count)
+        FROM experiments_keysummary
+        WHERE table_name = 'Experiment5M' AND number_of_columns = 2 AND (first_name, last_name) IN (
+            SELECT * FROM unnest('{John,Jane}'::varchar(255)[], '{Doe,Doe}'::varchar(255)[])
+        );
+
+        Each key is a single row of the summary, with the total age and number of the rows of the key.
+        The sums are numeric, divided as by AVG, so the result is identical.
+        """
+        return cls._fetch_average_age(*KeySummary.average_age_query(cls, inputs, input_columns))
+
+    @classmethod
+    def _sum_and_count_in_thread(cls, inputs: list[tuple], input_columns: list[str]) -> tuple[int | None, int]:
+        try:
+            with connection.cursor() as cursor:
+                sum_and_count = f"SUM({connection.ops.quote_name('age')}), COUNT(*)"
+                cursor.execute(*cls._unnest_arrays_query(inputs, input_columns, aggregates=sum_and_count))
+                return cursor.fetchone()
+        finally:
+            # Connections are per thread, and the threads of the pool end with the call
+            connection.close()
+
+    @classmethod
+    def _unnest_arrays_query(
+        cls, inputs: list[tuple], input_columns: list[str], aggregates: str | None = None
+    ) -> tuple[str, list]:
+        aggregates = aggregates or f"AVG({connection.ops.quote_name('age')})"
+        columns = [connection.ops.quote_name(column) for column in input_columns]
+        arrays = ", ".join(f"%s::{db_type}[]" for db_type in cls._db_types(input_columns))
+        sql = (
+            f"SELECT {aggregates} "
+            f"FROM {connection.ops.quote_name(cls._meta.db_table)} "
+            f"WHERE ({', '.join(columns)}) IN (SELECT * FROM unnest({arrays}))"
+        )
+        params = [[input_tuple[i] for input_tuple in inputs] for i in range(len(input_columns))]
+        return sql, params
+
+    @classmethod
+    def _join_inputs_sql(cls, inputs_relation: str, input_columns: list[str]) -> str:
+        """Build the AVG(age) query joining the table against a relation of input tuples."""
+        columns = [connection.ops.quote_name(column) for column in input_columns]
+        join_conditions = " AND ".join(f"t.{column} = i.{column}" for column in columns)
+        return (
+            f"SELECT AVG(t.{connection.ops.quote_name('age')}) "
+            f"FROM {connection.ops.quote_name(cls._meta.db_table)} AS t "
+            f"INNER JOIN (SELECT DISTINCT * FROM {inputs_relation} AS v ({', '.join(columns)})) AS i "
+            f"ON {join_conditions}"
+        )
+
+    @classmethod
+    def _db_types(cls, input_columns: list[str]) -> list[str]:
+        return [str(cls._fields_by_name()[column].db_type(connection)) for column in input_columns]
+
+    @classmethod
+    def _fetch_average_age(cls, sql: str, params: list | tuple | None = None) -> float | None:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            average_age = cursor.fetchone()[0]
+
+        # Same conversion as the Avg aggregate so that all methods return identical floats
+        return None if average_age is None else float(average_age)
+
+    @classmethod
+    async def _afetch_average_age(
+        cls, aconnection: "AsyncConnection", sql: str, params: list | tuple | None = None
+    ) -> float | None:
+        async with aconnection.cursor() as cursor:
+            await cursor.execute(sql, params)
+            row = await cursor.fetchone()
+
+        average_age = row[0] if row else None
+        return None if average_age is None else float(average_age)
+
+    @classmethod
+    def _aggregate_sql(cls, queryset: models.QuerySet) -> tuple[str, tuple] | None:
+        """SQL and parameters of the AVG(age) aggregate of the queryset, as compiled by aggregate().
+
+        Return None when no row can match: aggregate() does not query the database then.
+        """
+        query = queryset.query.chain()
+        query.default_cols = False
+        query.add_annotation(Avg("age"), "age__avg")
+        try:
+            return query.get_compiler(connection=connection).as_sql()
+        except EmptyResultSet:
+            return None
+
+    @classmethod
+    async def _afetch_aggregate(cls, aconnection: "AsyncConnection", queryset: models.QuerySet) -> float | None:
+        """Run the AVG(age) aggregate of the queryset on the async connection, with the SQL of aggregate()."""
+        aggregate_sql = cls._aggregate_sql(queryset)
+        if aggregate_sql is None:
+            return None
+
+        return await cls._afetch_average_age(aconnection, *aggregate_sql)
+
+    @classmethod
+    def time_orm_phases(
+        cls, method_name: str, inputs: list[tuple], input_columns: list[str]
+    ) -> tuple[float | None, dict[str, float]]:
+        """Run an ORM method in 3 timed phases and return its output with the time in ms of each phase:
+        building the queryset in Python, compiling it to SQL, and executing the SQL in the database.
+
+        Only the building phase depends on how the method expresses its filter with the ORM:
+        the others compare the SQL it produces.
+        """
+        build_queryset = getattr(cls, ORM_QUERYSET_BUILDERS[method_name])
+        start_time = time.perf_counter()
+        queryset = build_queryset(inputs, input_columns)
+        built_time = time.perf_counter()
+        aggregate_sql = cls._aggregate_sql(queryset)
+        compiled_time = time.perf_counter()
+        average_age = None if aggregate_sql is None else cls._fetch_average_age(*aggregate_sql)
+        executed_time = time.perf_counter()
+        return average_age, {
+            "build_ms": (built_time - start_time) * 1000,
+            "compile_ms": (compiled_time - built_time) * 1000,
+            "execute_ms": (executed_time - compiled_time) * 1000,
+        }
+
     @timeit
     @classmethod
     def filter_rows_with_in_tuples_legacy(cls, inputs: list[tuple[str, str]]) -> float:
@@ -181,3 +732,175 @@ class Experiment20M(ExperimentBase):
 
 class Experiment50M(ExperimentBase):
     _max_count = 50_000_000
+
+
+class Experiment50MHash(ExperimentBase):
+    """Same rows as Experiment50M, in EXPERIMENTS_PARTITION_COUNT partitions of smaller tables and indexes.
+
+    The primary key of the table is (id, first_name, last_name), as it must include the partition key.
+    Django only knows the id, which stays unique as it is drawn from a sequence.
+    """
+
+    _max_count = 50_000_000
+    _partitioned = True
+
+
+class GenerationRange(models.Model):
+    """Range of rows to generate for an experiment table, checkpointed after each batch to resume a parallel load."""
+
+    table_name = models.CharField(max_length=255)
+    range_start = models.BigIntegerField()
+    range_end = models.BigIntegerField()
+    rows_generated = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["table_name", "range_start"], name="unique_generation_range"),
+        ]
+
+    objects: models.Manager["GenerationRange"]
+
+    @property
+    def rows_remaining(self) -> int:
+        return self.range_end - self.range_start - self.rows_generated
+
+
+class KeySummary(FieldsByNameMixin, models.Model):
+    """Total age and number of the rows of an experiment table sharing a key, for each prefix of the input columns.
+
+    The columns after the prefix are NULL. Rows with a NULL email are summarized but never match an input,
+    as in the experiment tables.
+    Summaries are updated with each batch of rows inserted by insert_profiles, in the same transaction.
+    Loads without key summaries discard the summaries of the table: rebuild them with build_key_summaries.
+    """
+
+    table_name = models.CharField(max_length=255)
+    number_of_columns = models.PositiveSmallIntegerField()
+    first_name = models.CharField(max_length=255)
+    last_name = models.CharField(max_length=255)
+    age = models.IntegerField(null=True)
+    email = models.EmailField(max_length=255, null=True)
+    sum_age = models.BigIntegerField()
+    count = models.BigIntegerField()
+
+    class Meta:
+        constraints = [
+            # Also the index of the lookups
+            models.UniqueConstraint(
+                fields=["table_name", "number_of_columns", *ALL_INPUT_COLUMNS],
+                name="unique_key_summary",
+                nulls_distinct=False,
+            ),
+        ]
+
+    objects: models.Manager["KeySummary"]
+
+    @classmethod
+    def add_profiles(cls, experiment_table: type[ExperimentBase], profiles: list[dict]) -> None:
+        """Add a batch of profiles inserted into the table to the summaries of their keys, with a single upsert.
+
+        Keys are upserted in a stable order, so that concurrent batches lock the rows they share in the same order.
+        """
+        totals: dict[tuple, list[int]] = {}
+        for number_of_columns in map(len, key_column_prefixes(ALL_INPUT_COLUMNS)):
+            for profile in profiles:
+                key = tuple(
+                    profile[column] if i < number_of_columns else None for i, column in enumerate(ALL_INPUT_COLUMNS)
+                )
+                total = totals.setdefault((number_of_columns, *key), [0, 0])
+                total[0] += profile["age"]
+                total[1] += 1
+        if not totals:
+            return
+
+        keys = sorted(totals, key=lambda key: tuple((value is None, "" if value is None else value) for value in key))
+        fields = ["number_of_columns", *ALL_INPUT_COLUMNS, "sum_age", "count"]
+        table_name = connection.ops.quote_name(cls._meta.db_table)
+        arrays = ", ".join(f"%s::{cls._fields_by_name()[field].db_type(connection)}[]" for field in fields)
+        columns = ", ".join(connection.ops.quote_name(field) for field in fields)
+        increments = ", ".join(
+            f"{column} = {table_name}.{column} + EXCLUDED.{column}"
+            for column in [connection.ops.quote_name("sum_age"), connection.ops.quote_name("count")]
+        )
+        params: list = [
+            experiment_table.__name__,
+            *([key[i] for key in keys] for i in range(len(ALL_INPUT_COLUMNS) + 1)),
+            [totals[key][0] for key in keys],
+            [totals[key][1] for key in keys],
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {table_name} ({connection.ops.quote_name('table_name')}, {columns}) "
+                f"SELECT %s, * FROM unnest({arrays}) "
+                f"ON CONFLICT ON CONSTRAINT unique_key_summary DO UPDATE SET {increments}",
+                params,
+            )
+
+    @classmethod
+    def discard(cls, experiment_table: type[ExperimentBase]) -> None:
+        """Delete the summaries of a table loaded without maintaining them, as they would miss the new rows."""
+        deleted, _ = cls.objects.filter(table_name=experiment_table.__name__).delete()
+        if deleted:
+            logger.warning(
+                f"Discarded the {deleted} key summaries of {experiment_table.__name__}: "
+                "rebuild them with the build_key_summaries command"
+            )
+
+    @classmethod
+    def rebuild(cls, experiment_table: type[ExperimentBase]) -> None:
+        """Summarize the rows already in the table, for tables loaded before their summaries were maintained."""
+        table_name = connection.ops.quote_name(experiment_table._meta.db_table)
+        columns = ", ".join(
+            connection.ops.quote_name(field) for field in ["number_of_columns", *ALL_INPUT_COLUMNS, "sum_age", "count"]
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            cls.objects.filter(table_name=experiment_table.__name__).delete()
+            for column_prefix in key_column_prefixes(ALL_INPUT_COLUMNS):
+                number_of_columns = len(column_prefix)
+                key_columns = [connection.ops.quote_name(column) for column in column_prefix]
+                padding = ["NULL"] * (len(ALL_INPUT_COLUMNS) - number_of_columns)
+                cursor.execute(
+                    f"INSERT INTO {connection.ops.quote_name(cls._meta.db_table)} "
+                    f"({connection.ops.quote_name('table_name')}, {columns}) "
+                    f"SELECT %s, %s, {', '.join([*key_columns, *padding])}, "
+                    f"SUM({connection.ops.quote_name('age')}), COUNT(*) "
+                    f"FROM {table_name} GROUP BY {', '.join(key_columns)}",
+                    [experiment_table.__name__, number_of_columns],
+                )
+
+    @classmethod
+    def average_age_query(
+        cls, experiment_table: type[ExperimentBase], inputs: list[tuple], input_columns: list[str]
+    ) -> tuple[str, list]:
+        if input_columns not in key_column_prefixes(ALL_INPUT_COLUMNS):
+            raise ValueError(f"Keys are summarized on prefixes of {ALL_INPUT_COLUMNS} only, not on {input_columns}")
+
+        columns = [connection.ops.quote_name(column) for column in input_columns]
+        arrays = ", ".join(f"%s::{cls._fields_by_name()[column].db_type(connection)}[]" for column in input_columns)
+        sql = (
+            f"SELECT SUM({connection.ops.quote_name('sum_age')}) / SUM({connection.ops.quote_name('count')}) "
+            f"FROM {connection.ops.quote_name(cls._meta.db_table)} "
+            f"WHERE {connection.ops.quote_name('table_name')} = %s "
+            f"AND {connection.ops.quote_name('number_of_columns')} = %s "
+            f"AND ({', '.join(columns)}) IN (SELECT * FROM unnest({arrays}))"
+        )
+        params = [
+            experiment_table.__name__,
+            len(input_columns),
+            *([input_tuple[i] for input_tuple in inputs] for i in range(len(input_columns))),
+        ]
+        return sql, params
+
+    @classmethod
+    def statistics(cls, experiment_table: type[ExperimentBase], input_columns: list[str]) -> dict[str, Any]:
+        """Number of summaries of the table on the columns, of rows they summarize, and the ratio between both."""
+        totals = cls.objects.filter(
+            table_name=experiment_table.__name__, number_of_columns=len(input_columns)
+        ).aggregate(summary_rows=Count("id"), table_rows=Sum("count"))
+        table_rows = totals["table_rows"] or 0
+        return {
+            "summary_rows": totals["summary_rows"],
+            "table_rows": table_rows,
+            "shrink_factor": table_rows / totals["summary_rows"] if totals["summary_rows"] else None,
+        }
@@ -0,0 +1,271 @@
+import json
+import sqlite3
+import subprocess
+from contextlib import closing
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+
+from django.conf import settings
+from django.db import connection
+
+from experiments.models import ExperimentBase
+
+# Sections of the results holding the samples of each method by table: a list of samples, or lists by measure
+SAMPLE_SECTIONS = ["samples", "connection", "phase_timings", "orm_phase_timings", "bloom"]
+# Measure of the samples section, the duration of each recorded run
+DURATION_MEASURE = "duration_ms"
+# Server settings recorded with each run, in addition to the settings changed from their default
+SERVER_SETTINGS = [
+    "shared_buffers",
+    "work_mem",
+    "effective_cache_size",
+    "random_page_cost",
+    "max_parallel_workers_per_gather",
+    "jit",
+    "plan_cache_mode",
+]
+# Columns of the runs and samples returned with each sample, by name.
+# The other dimensions are the keys of the configuration dimensions.
+SAMPLE_COLUMNS = {
+    "run_id": "runs.id",
+    "kind": "runs.kind",
+    "git_commit": "runs.git_commit",
+    "postgres_version": "runs.postgres_version",
+    "configuration_id": "samples.configuration_id",
+    "table_name": "samples.table_name",
+    "method_name": "samples.method_name",
+    "measure": "samples.measure",
+    "sample_index": "samples.sample_index",
+    "value": "samples.value",
+}
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    git_commit TEXT,
+    git_dirty INTEGER,
+    postgres_version TEXT NOT NULL,
+    server_settings TEXT NOT NULL,
+    estimated_table_rows TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS configurations (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    saved_at TEXT NOT NULL,
+    dimensions TEXT NOT NULL,
+    results TEXT NOT NULL,
+    explain_results TEXT
+);
+CREATE TABLE IF NOT EXISTS samples (
+    configuration_id INTEGER NOT NULL REFERENCES configurations (id),
+    table_name TEXT NOT NULL,
+    method_name TEXT NOT NULL,
+    measure TEXT NOT NULL,
+    sample_index INTEGER NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_configuration_index ON samples (configuration_id);
+CREATE INDEX IF NOT EXISTS samples_method_index ON samples (method_name, measure);
+"""
+
+
+def open_store() -> sqlite3.Connection:
+    """Connection to the results store at settings.RESULTS_STORE_PATH, created on first use."""
+    store_path = Path(settings.RESULTS_STORE_PATH)
+    store_path.parent.mkdir(parents=True, exist_ok=True)
+    store = sqlite3.connect(store_path, timeout=60)
+    store.row_factory = sqlite3.Row
+    store.executescript(SCHEMA_SQL)
+    return store
+
+
+def git_state() -> tuple[str | None, bool | None]:
+    """Commit of the code and whether it has uncommitted changes, or None outside of a git checkout."""
+    code_dir = Path(__file__).resolve().parent
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=code_dir, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=code_dir,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+    return commit, bool(status.strip())
+
+
+def server_state() -> tuple[str, dict[str, str]]:
+    """Version of the PostgreSQL server, and its settings changed from their default or in SERVER_SETTINGS."""
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW server_version")
+        version = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT name, setting, unit FROM pg_settings WHERE source NOT IN ('default', 'override') OR name = ANY(%s)",
+            [SERVER_SETTINGS],
+        )
+        server_settings = {name: f"{setting}{unit or ''}" for name, setting, unit in cursor.fetchall()}
+
+    return version, server_settings
+
+
+def estimated_rows(experiment_table: type[ExperimentBase]) -> int | None:
+    """Number of rows of the table estimated by the last ANALYZE, or None if it was never analyzed.
+
+    The table is not counted: counting the largest tables takes longer than most experiments.
+    The rows of a partitioned table are estimated on its partitions, which autovacuum analyzes.
+    """
+    table_name = connection.ops.quote_name(experiment_table._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT SUM(reltuples) FILTER (WHERE reltuples >= 0) FROM pg_class "
+            "WHERE (oid = %s::regclass AND relkind = 'r') "
+            "OR oid IN (SELECT relid FROM pg_partition_tree(%s::regclass) WHERE isleaf)",
+            [table_name, table_name],
+        )
+        rows = cursor.fetchone()[0]
+
+    return None if rows is None else int(rows)
+
+
+def start_run(kind: str) -> int:
+    """Record the metadata of a run of experiments and return its id, to save its configurations with.
+
+    :param kind: how the experiments are run, e.g. sync, async, load or celery.
+    """
+    commit, dirty = git_state()
+    version, server_settings = server_state()
+    estimated_table_rows = {
+        experiment_table.__name__: estimated_rows(experiment_table)
+        for experiment_table in ExperimentBase.submodels_by_size().values()
+    }
+    with closing(open_store()) as store, store:
+        cursor = store.execute(
+            "INSERT INTO runs (kind, started_at, git_commit, git_dirty, postgres_version, server_settings, "
+            "estimated_table_rows) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                kind,
+                datetime.now(timezone.utc).isoformat(),
+                commit,
+                dirty,
+                version,
+                json.dumps(server_settings),
+                json.dumps(estimated_table_rows),
+            ],
+        )
+    assert cursor.lastrowid is not None
+    return cursor.lastrowid
+
+
+def get_run(run_id: int) -> dict[str, Any]:
+    """Metadata of a run: how it was run, when, on which commit, server version and settings,
+    and estimated table rows.
+    """
+    with closing(open_store()) as store:
+        row = store.execute("SELECT * FROM runs WHERE id = ?", [run_id]).fetchone()
+    if row is None:
+        raise ValueError(f"No run {run_id} in the results store")
+
+    run = dict(row)
+    run["git_dirty"] = None if run["git_dirty"] is None else bool(run["git_dirty"])
+    run["server_settings"] = json.loads(run["server_settings"])
+    run["estimated_table_rows"] = json.loads(run["estimated_table_rows"])
+    return run
+
+
+def iter_samples(results: dict[str, Any]) -> Iterator[tuple[str, str, str, int, float]]:
+    """Table, method, measure, index and value of each sample of the results."""
+    for section in SAMPLE_SECTIONS:
+        for table_name, series_by_method in results.get(section, {}).items():
+            for method_name, series in series_by_method.items():
+                if isinstance(series, list):
+                    measures = {DURATION_MEASURE if section == "samples" else section: series}
+                else:
+                    measures = {
+                        f"{section}.{name}": values for name, values in series.items() if isinstance(values, list)
+                    }
+                for measure, values in measures.items():
+                    for sample_index, value in enumerate(values):
+                        yield table_name, method_name, measure, sample_index, value
+
+
+def configuration_dimensions(results: dict[str, Any]) -> dict[str, Any]:
+    """Options and parameters of a configuration: the values of the results that are not by table."""
+    dimensions = {key: value for key, value in results.items() if not isinstance(value, dict)}
+    dimensions["number_of_columns"] = len(results["columns"])
+    return dimensions
+
+
+def save_configuration(
+    results: dict[str, Any], run_id: int | None, kind: str, explain_results: dict[str, Any] | None = None
+) -> int:
+    """Append the results of a configuration and all their samples to the store, and return the configuration id.
+
+    The results are stored without their samples, which are rows of the samples table.
+    A run is started when no run id is given.
+    """
+    if run_id is None:
+        run_id = start_run(kind)
+    with closing(open_store()) as store, store:
+        cursor = store.execute(
+            "INSERT INTO configurations (run_id, saved_at, dimensions, results, explain_results) VALUES (?, ?, ?, ?, ?)",
+            [
+                run_id,
+                datetime.now(timezone.utc).isoformat(),
+                json.dumps(configuration_dimensions(results)),
+                json.dumps({key: value for key, value in results.items() if key != "samples"}),
+                None if explain_results is None else json.dumps(explain_results),
+            ],
+        )
+        configuration_id = cursor.lastrowid
+        store.executemany(
+            "INSERT INTO samples (configuration_id, table_name, method_name, measure, sample_index, value) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            ((configuration_id, *sample) for sample in iter_samples(results)),
+        )
+    assert configuration_id is not None
+    return configuration_id
+
+
+def query_samples(**dimensions: Any) -> list[dict[str, Any]]:
+    """Samples matching all the dimensions, with the dimensions of their configuration.
+
+    Dimensions are the SAMPLE_COLUMNS, e.g. method_name="filter_rows_with_in_tuples",
+    or the keys of the configuration dimensions, e.g. cache_mode="cold" or input_size=100.
+    """
+    conditions = []
+    params = []
+    for name, value in dimensions.items():
+        if name in SAMPLE_COLUMNS:
+            conditions.append(f"{SAMPLE_COLUMNS[name]} = ?")
+            params.append(value)
+        elif isinstance(value, (list, dict)):
+            # Arrays and objects are extracted as minified JSON
+            conditions.append("json_extract(configurations.dimensions, ?) = json(?)")
+            params += [f'$."{name}"', json.dumps(value)]
+        else:
+            conditions.append("json_extract(configurations.dimensions, ?) = ?")
+            params += [f'$."{name}"', value]
+
+    with closing(open_store()) as store:
+        rows = store.execute(
+            f"SELECT {', '.join(f'{column} AS {name}' for name, column in SAMPLE_COLUMNS.items())}, "
+            "configurations.dimensions "
+            "FROM samples "
+            "JOIN configurations ON configurations.id = samples.configuration_id "
+            "JOIN runs ON runs.id = configurations.run_id "
+            f"WHERE {' AND '.join(conditions) or 'TRUE'} "
+            "ORDER BY samples.configuration_id, samples.table_name, samples.method_name, samples.measure, "
+            "samples.sample_index",
+            params,
+        ).fetchall()
+
+    return [{**dict(row), "dimensions": json.loads(row["dimensions"])} for row in rows]
@@ -0,0 +1,475 @@
+import time
+from collections import Counter
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from experiments.bloom import BloomFilter, bloom_filter_path, prefiltered_method
+from experiments.buffers import DEFAULT_CACHE_MODE, evict_buffers, prewarm, run_evict_command
+from experiments.cache import CACHED_METHODS, DEFAULT_CACHED_INPUT_SETS, cached_method
+from experiments.columnar import columnar_index_dir
+from experiments.indexes import DEFAULT_INDEX_VARIANT
+from experiments.instrumentation import capture_explain_plans, capture_phases
+from experiments.models import (
+    ALL_INPUT_COLUMNS,
+    DEFAULT_FAKE_INPUTS_PERCENT,
+    DEFAULT_INPUT_SAMPLING,
+    DEFAULT_NUMBER_RUNS,
+    DEFAULT_WARMUP_RUNS,
+    ORM_QUERYSET_BUILDERS,
+    ExperimentBase,
+    KeySummary,
+)
+from experiments.results_store import estimated_rows, save_configuration
+from experiments.stats import summarize_samples
+from experiments.utils import DEFAULT_PROFILE_GENERATOR, save_to_json
+from plot.graph import plot_graph
+
+# Statistics of the key summaries by table, number of columns and estimated rows of the table
+_key_summary_statistics: dict[tuple[str, int, int | None], dict[str, Any]] = {}
+
+
+@dataclass
+class ExperimentOptions:
+    number_runs: int = DEFAULT_NUMBER_RUNS
+    warmup_runs: int = DEFAULT_WARMUP_RUNS
+    fake_inputs_percent: int = DEFAULT_FAKE_INPUTS_PERCENT
+    reverse_order: bool = False
+    generator: str = DEFAULT_PROFILE_GENERATOR
+    sampling: str = DEFAULT_INPUT_SAMPLING
+    explain: bool = False
+    cache_mode: str = DEFAULT_CACHE_MODE
+    evict_command: str | None = None
+    cache_results: bool = False
+    cached_input_sets: int = DEFAULT_CACHED_INPUT_SETS
+    connection_timing: bool = False
+    bloom_prefilter: bool = False
+    columnar: bool = False
+    key_summary: bool = False
+    orm_phases: bool = False
+    phases: bool = False
+    # Also save each configuration to its own JSON file with its graph
+    json_files: bool = False
+    # Run of the results store the configurations are saved to, a run is started per configuration when None
+    results_run_id: int | None = None
+    index_variant: str = DEFAULT_INDEX_VARIANT
+    # Size and build time of the indexes of the variant by table name, recorded with the results
+    index_builds: dict[str, dict] = field(default_factory=dict)
+
+
+def generate_inputs(
+    experiment_table: type[ExperimentBase], input_size: int, columns: list[str], options: ExperimentOptions
+) -> list[tuple]:
+    return experiment_table.generate_inputs(
+        input_size,
+        columns,
+        fake_percent=options.fake_inputs_percent,
+        generator=options.generator,
+        sampling=options.sampling,
+    )
+
+
+def set_cache_state(experiment_table: type[ExperimentBase], options: ExperimentOptions, cache_state: dict) -> None:
+    """Bring the caches to the state of the cache mode before a recorded sample, and record what was done."""
+    if options.cache_mode == "warm" and "prewarmed_blocks" not in cache_state:
+        cache_state["prewarmed_blocks"] = prewarm(experiment_table)
+    elif options.cache_mode == "cold":
+        evicted_buffers = evict_buffers(experiment_table)
+        if evicted_buffers is not None:
+            cache_state["evicted_buffers"] = cache_state.get("evicted_buffers", 0) + evicted_buffers
+        if options.evict_command:
+            run_evict_command(options.evict_command)
+            cache_state["evict_commands"] = cache_state.get("evict_commands", 0) + 1
+
+
+def reconnect() -> float:
+    """Release the connection, then open a new one or take one from the pool, and return the time it took in ms."""
+    connection.close()
+    start_time = time.perf_counter()
+    connection.ensure_connection()
+    return (time.perf_counter() - start_time) * 1000
+
+
+def explain_timings(method: Callable, inputs: list[tuple], columns: list[str]) -> tuple[float, float]:
+    """Run the method again and return the planning and execution time in ms reported by EXPLAIN ANALYZE."""
+    with capture_explain_plans() as plans:
+        method(inputs, columns)
+
+    return sum(plan["planning_time_ms"] for plan in plans), sum(plan["execution_time_ms"] for plan in plans)
+
+
+def measure_method(  # noqa: PLR0913
+    experiment_table: type[ExperimentBase],
+    method: Callable,
+    input_size: int,
+    columns: list[str],
+    options: ExperimentOptions,
+    input_sets: list[list[tuple]] | None = None,
+) -> tuple[list[float], dict, dict[str, list[float]], dict[str, list]]:
+    """Return the duration in ms of each recorded run of the method, the cache state of the runs,
+    the connection, planning and execution times of each run if connection timing is enabled,
+    and the phases of each run if phases are enabled.
+
+    :param input_sets: inputs replayed in turn by the runs, instead of drawing new inputs for each run.
+    """
+    durations_ms: list[float] = []
+    cache_state: dict = {}
+    connection_timings: dict[str, list[float]] = {"connection_ms": [], "planning_ms": [], "execution_ms": []}
+    phases: dict[str, list] = {}
+    for i in range(options.warmup_runs + options.number_runs):
+        is_warmup = i < options.warmup_runs
+        print(
+            f"Warm-up run {i + 1}/{options.warmup_runs}..."
+            if is_warmup
+            else f"Run {len(durations_ms) + 1}/{options.number_runs}..."
+        )
+        if input_sets:
+            inputs = input_sets[i % len(input_sets)]
+        else:
+            inputs = generate_inputs(experiment_table, input_size, columns, options)
+        if not is_warmup:
+            set_cache_state(experiment_table, options, cache_state)
+            if options.connection_timing:
+                connection_timings["connection_ms"].append(reconnect())
+
+        # Only measure the experiment method
+        with capture_phases() if options.phases else nullcontext() as run_phases:
+            start_time = time.perf_counter()
+            method(inputs, columns)
+            duration_ms = (time.perf_counter() - start_time) * 1000
+        if not is_warmup:
+            durations_ms.append(duration_ms)
+            if run_phases is not None:
+                # Python time of the call outside of the compilation and execution of its queries
+                run_phases["build_ms"] = duration_ms - run_phases["compile_ms"] - run_phases["execute_ms"]
+                for phase, value in run_phases.items():
+                    phases.setdefault(phase, []).append(value)
+            if options.connection_timing:
+                planning_ms, execution_ms = explain_timings(method, inputs, columns)
+                connection_timings["planning_ms"].append(planning_ms)
+                connection_timings["execution_ms"].append(execution_ms)
+
+    return durations_ms, cache_state, connection_timings, phases
+
+
+def index_variant_tag(options: ExperimentOptions) -> str:
+    """Part of the result filenames naming the index variant, empty for the default indexes."""
+    return "" if options.index_variant == DEFAULT_INDEX_VARIANT else f"{options.index_variant}index_"
+
+
+def new_results(input_size: int, columns: list[str], options: ExperimentOptions) -> dict[str, Any]:
+    return {
+        "input_size": input_size,
+        "columns": columns,
+        "number_runs": options.number_runs,
+        "warmup_runs": options.warmup_runs,
+        "fake_inputs_percent": options.fake_inputs_percent,
+        "generator": options.generator,
+        "sampling": options.sampling,
+        "cache_mode": options.cache_mode,
+        "evict_command": options.evict_command,
+        "cache_results": options.cache_results,
+        "cached_input_sets": options.cached_input_sets,
+        "connection_timing": options.connection_timing,
+        "bloom_prefilter": options.bloom_prefilter,
+        "columnar": options.columnar,
+        "key_summary": options.key_summary,
+        "orm_phases": options.orm_phases,
+        "phases": options.phases,
+        "db_connection_profile": settings.DB_CONNECTION_PROFILE,
+        "index_variant": options.index_variant,
+        "indexes": options.index_builds,
+        "samples": {},
+        "statistics": {},
+        "cache": {},
+        "result_cache": {},
+        "connection": {},
+        "bloom": {},
+        "key_summaries": {},
+        "phase_timings": {},
+        "orm_phase_timings": {},
+    }
+
+
+def record_samples(
+    results: dict[str, Any], table_name: str, method_name: str, durations_ms: list[float], cache_state: dict
+) -> None:
+    """Add the samples of a method and their statistics to the results of an experiment."""
+    statistics = summarize_samples(durations_ms)
+    print(
+        f"Runtime for {method_name}/{table_name}: mean={statistics['mean']:.2f} ms "
+        f"[{statistics['ci_low']:.2f}, {statistics['ci_high']:.2f}] | median={statistics['median']:.2f} ms | "
+        f"p99={statistics['p99']:.2f} ms | outliers={len(statistics['outliers'])}"
+    )
+
+    if table_name not in results:
+        results[table_name] = {}
+        results["samples"][table_name] = {}
+        results["statistics"][table_name] = {}
+        results["cache"][table_name] = {}
+    results[table_name][method_name] = statistics["mean"]
+    results["samples"][table_name][method_name] = durations_ms
+    results["statistics"][table_name][method_name] = statistics
+    results["cache"][table_name][method_name] = cache_state
+
+
+def measure_cell(
+    experiment_table: type[ExperimentBase],
+    method_name: str,
+    input_size: int,
+    columns: list[str],
+    options: ExperimentOptions,
+) -> dict[str, Any]:
+    """Measure one cell of the experiment matrix: a method on a table, for an input size and columns."""
+    table_name = experiment_table.__name__
+    print(f"Testing {method_name} for {table_name}...")
+    method = getattr(experiment_table, method_name)
+    measured_method = method
+    cache_counters: Counter = Counter()
+    input_sets = None
+    if options.cache_results and method_name in CACHED_METHODS:
+        measured_method = cached_method(experiment_table, method, cache_counters)
+        # New inputs for each run would never hit the cache
+        input_sets = [
+            generate_inputs(experiment_table, input_size, columns, options) for _ in range(options.cached_input_sets)
+        ]
+    durations_ms, cache_state, connection_timings, phases = measure_method(
+        experiment_table, measured_method, input_size, columns, options, input_sets
+    )
+    cell: dict[str, Any] = {
+        "table_name": table_name,
+        "method_name": method_name,
+        "durations_ms": durations_ms,
+        "cache_state": cache_state,
+    }
+    if options.connection_timing:
+        cell["connection_timings"] = connection_timings
+    if options.phases:
+        cell["phases"] = phases
+    if measured_method is not method:
+        # Warm-up runs are counted too, as they fill the cache
+        cell["result_cache"] = {
+            "hits": cache_counters["hits"],
+            "misses": cache_counters["misses"],
+            "hit_ratio": cache_counters["hits"] / (cache_counters["hits"] + cache_counters["misses"]),
+        }
+
+    if options.bloom_prefilter:
+        cell["bloom"] = measure_bloom_prefilter(experiment_table, method, input_size, columns, options)
+        cell["bloom"]["saved_ms"] = float(np.mean(durations_ms) - np.mean(cell["bloom"]["durations_ms"]))
+
+    if options.orm_phases and method_name in ORM_QUERYSET_BUILDERS:
+        cell["orm_phases"] = measure_orm_phases(experiment_table, method_name, input_size, columns, options)
+
+    if options.explain:
+        print(f"Capturing plans of {method_name} for {table_name}...")
+        inputs = generate_inputs(experiment_table, input_size, columns, options)
+        with capture_explain_plans() as plans:
+            method(inputs, columns)
+        cell["plans"] = plans
+
+    return cell
+
+
+def measure_bloom_prefilter(
+    experiment_table: type[ExperimentBase],
+    method: Callable,
+    input_size: int,
+    columns: list[str],
+    options: ExperimentOptions,
+) -> dict[str, Any]:
+    """Measure the method again with the inputs absent from the Bloom filter of the table dropped before the query.
+
+    Return the durations in ms of the recorded runs, the number of inputs checked and dropped by the filter,
+    and the size and estimated false positive rate of the filter.
+    """
+    print(f"Testing {method.__name__} for {experiment_table.__name__} with the Bloom filter...")
+    path = bloom_filter_path(experiment_table, columns)
+    if not path.exists():
+        print(f"No Bloom filter at {path}: build it with the build_bloom_filters command")
+    bloom_counters: Counter = Counter()
+    durations_ms, *_ = measure_method(
+        experiment_table, prefiltered_method(experiment_table, method, bloom_counters), input_size, columns, options
+    )
+    return {
+        "durations_ms": durations_ms,
+        # Warm-up runs are counted too
+        "checked_inputs": bloom_counters["checked_inputs"],
+        "dropped_inputs": bloom_counters["dropped_inputs"],
+        "filter": BloomFilter(path).statistics() if path.exists() else None,
+    }
+
+
+def measure_orm_phases(
+    experiment_table: type[ExperimentBase],
+    method_name: str,
+    input_size: int,
+    columns: list[str],
+    options: ExperimentOptions,
+) -> dict[str, list[float]]:
+    """Run the ORM method again and return the time in ms of its build, compile and execute phases in each
+    recorded run.
+    """
+    print(f"Timing the ORM phases of {method_name} for {experiment_table.__name__}...")
+    phases: dict[str, list[float]] = {"build_ms": [], "compile_ms": [], "execute_ms": []}
+    for i in range(options.warmup_runs + options.number_runs):
+        inputs = generate_inputs(experiment_table, input_size, columns, options)
+        _, run_phases = experiment_table.time_orm_phases(method_name, inputs, columns)
+        if i >= options.warmup_runs:
+            for phase, duration_ms in run_phases.items():
+                phases[phase].append(duration_ms)
+
+    return phases
+
+
+def record_cell(results: dict[str, Any], explain_results: dict[str, Any], cell: dict[str, Any]) -> None:
+    """Add the measures of a cell of the experiment matrix to the results of its input size and columns."""
+    table_name = cell["table_name"]
+    method_name = cell["method_name"]
+    record_samples(results, table_name, method_name, cell["durations_ms"], cell["cache_state"])
+    if "connection_timings" in cell:
+        print(
+            f"Connection timing for {method_name}/{table_name} ({results['db_connection_profile']}): "
+            + " | ".join(f"{name}={np.mean(values):.2f}" for name, values in cell["connection_timings"].items())
+        )
+        results["connection"].setdefault(table_name, {})[method_name] = cell["connection_timings"]
+    if "result_cache" in cell:
+        result_cache = cell["result_cache"]
+        print(
+            f"Result cache for {method_name}/{table_name}: hits={result_cache['hits']} "
+            f"misses={result_cache['misses']} | hit_ratio={result_cache['hit_ratio']:.2f}"
+        )
+        results["result_cache"].setdefault(table_name, {})[method_name] = cell["result_cache"]
+    if "bloom" in cell:
+        bloom = cell["bloom"]
+        print(
+            f"Bloom filter for {method_name}/{table_name}: dropped {bloom['dropped_inputs']}/{bloom['checked_inputs']} "
+            f"inputs | saved={bloom['saved_ms']:.2f} ms"
+        )
+        results["bloom"].setdefault(table_name, {})[method_name] = bloom
+    if "phases" in cell:
+        print(
+            f"Phases for {method_name}/{table_name}: "
+            + " | ".join(f"{name}={np.mean(values):.2f}" for name, values in cell["phases"].items())
+        )
+        results["phase_timings"].setdefault(table_name, {})[method_name] = cell["phases"]
+    if "orm_phases" in cell:
+        print(
+            f"ORM phases for {method_name}/{table_name}: "
+            + " | ".join(f"{name}={np.mean(values):.2f}" for name, values in cell["orm_phases"].items())
+        )
+        results["orm_phase_timings"].setdefault(table_name, {})[method_name] = cell["orm_phases"]
+    if "plans" in cell:
+        explain_results.setdefault(table_name, {})[method_name] = cell["plans"]
+
+
+def record_key_summary(results: dict[str, Any], experiment_table: type[ExperimentBase]) -> None:
+    """Add how many times fewer rows the key summary of the table holds, and how many times faster it answers
+    than the in_tuples method on the table.
+    """
+    table_name = experiment_table.__name__
+    # Counted once per table and columns rather than after each configuration: the summaries of the largest tables
+    # are about as large as the tables. They are counted again when the estimated rows of the table change.
+    statistics_key = (table_name, len(results["columns"]), estimated_rows(experiment_table))
+    if statistics_key not in _key_summary_statistics:
+        _key_summary_statistics[statistics_key] = KeySummary.statistics(experiment_table, results["columns"])
+    key_summary = dict(_key_summary_statistics[statistics_key])
+    key_summary["speedup"] = (
+        results[table_name]["filter_rows_with_in_tuples"] / results[table_name]["filter_rows_with_key_summary"]
+    )
+    print(
+        f"Key summary of {table_name}: {key_summary['summary_rows']} rows for {key_summary['table_rows']} | "
+        f"shrink={key_summary['shrink_factor'] or 0:.1f}x | speedup={key_summary['speedup']:.1f}x"
+    )
+    results["key_summaries"][table_name] = key_summary
+
+
+def new_explain_results(results: dict[str, Any]) -> dict[str, Any]:
+    return {key: results[key] for key in ["input_size", "columns", "sampling"]}
+
+
+def save_results(
+    results: dict[str, Any],
+    explain_results: dict[str, Any] | None,
+    options: ExperimentOptions,
+    kind: str = "sync",
+    filename_tag: str = "",
+) -> int:
+    """Append the results of an input size and columns to the results store, and return their configuration id.
+
+    With json_files, also save them to JSON with their graph.
+
+    :param explain_results: the EXPLAIN plans of the methods, or None when the runner does not capture them.
+    :param filename_tag: tag of the runner in the names of the JSON files, e.g. async_4inflight_.
+    """
+    if not options.explain:
+        explain_results = None
+    configuration_id = save_configuration(results, options.results_run_id, kind, explain_results)
+    if options.json_files:
+        filename_suffix = (
+            f"{filename_tag}{index_variant_tag(options)}{options.number_runs}runs_{options.fake_inputs_percent}fake_"
+            f"{results['input_size']}size_{len(results['columns'])}cols.json"
+        )
+        json_filename = f"experiments_{filename_suffix}"
+        save_to_json(results, json_filename)
+        if explain_results is not None:
+            save_to_json(explain_results, f"explain_{filename_suffix}")
+
+        # Generate graph
+        plot_graph(json_filename)
+        print(f"Results saved to {json_filename}")
+
+    return configuration_id
+
+
+def check_key_summaries() -> None:
+    """Raise ValueError before measuring when a table with rows has no key summaries, e.g. after a load without them."""
+    for experiment_table in ExperimentBase.submodels_by_size().values():
+        if (
+            experiment_table.objects.exists()
+            and not KeySummary.objects.filter(table_name=experiment_table.__name__).exists()
+        ):
+            raise ValueError(
+                f"{experiment_table.__name__} has no key summaries: build them with the build_key_summaries command"
+            )
+
+
+def check_columnar_indexes(columns: list[str]) -> None:
+    """Raise FileNotFoundError before measuring when a table was not exported on the columns."""
+    for experiment_table in ExperimentBase.submodels_by_size().values():
+        index_dir = columnar_index_dir(experiment_table, columns)
+        if not index_dir.exists():
+            raise FileNotFoundError(
+                f"{experiment_table.__name__} has no columnar index on {', '.join(columns)} in {index_dir}: "
+                "export it with the build_columnar_index command"
+            )
+
+
+def run_experiment(input_size: int, input_columns: int, options: ExperimentOptions):
+    columns = ALL_INPUT_COLUMNS[:input_columns]
+    results = new_results(input_size, columns, options)
+    explain_results = new_explain_results(results)
+    experiment_methods = ExperimentBase.experiment_methods()
+    if options.columnar:
+        check_columnar_indexes(columns)
+        experiment_methods.append(ExperimentBase.filter_rows_with_columnar)
+    if options.key_summary:
+        check_key_summaries()
+        experiment_methods.append(ExperimentBase.filter_rows_with_key_summary)
+    if options.reverse_order:
+        experiment_methods.reverse()
+    for base_method in experiment_methods:
+        for experiment_table in ExperimentBase.submodels_by_size().values():
+            cell = measure_cell(experiment_table, base_method.__name__, input_size, columns, options)
+            record_cell(results, explain_results, cell)
+
+    if options.key_summary:
+        for experiment_table in ExperimentBase.submodels_by_size().values():
+            record_key_summary(results, experiment_table)
+
+    configuration_id = save_results(results, explain_results, options)
+    print(f"Experiments completed. Results saved to {settings.RESULTS_STORE_PATH} (configuration {configuration_id})")
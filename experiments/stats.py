@@ -0,0 +1,52 @@
+from typing import Any
+
+import numpy as np
+
+DEFAULT_CONFIDENCE_LEVEL = 0.95
+DEFAULT_BOOTSTRAP_RESAMPLES = 10_000
+OUTLIER_IQR_FACTOR = 1.5
+
+
+def bootstrap_confidence_interval(
+    samples: list[float],
+    confidence_level: float = DEFAULT_CONFIDENCE_LEVEL,
+    resamples: int = DEFAULT_BOOTSTRAP_RESAMPLES,
+    seed: int | None = None,
+) -> tuple[float, float]:
+    """Percentile bootstrap confidence interval of the mean."""
+    rng = np.random.default_rng(seed)
+    values = np.asarray(samples, dtype=float)
+    resampled_means = rng.choice(values, size=(resamples, len(values)), replace=True).mean(axis=1)
+    alpha = (1 - confidence_level) / 2
+    low, high = np.quantile(resampled_means, [alpha, 1 - alpha])
+    return float(low), float(high)
+
+
+def find_outliers(samples: list[float], iqr_factor: float = OUTLIER_IQR_FACTOR) -> list[int]:
+    """Indexes of the samples outside of Tukey's fences: [Q1 - k * IQR, Q3 + k * IQR]."""
+    values = np.asarray(samples, dtype=float)
+    first_quartile, third_quartile = np.quantile(values, [0.25, 0.75])
+    margin = iqr_factor * (third_quartile - first_quartile)
+    is_outlier = (values < first_quartile - margin) | (values > third_quartile + margin)
+    return np.flatnonzero(is_outlier).tolist()
+
+
+def summarize_samples(samples: list[float], seed: int | None = None) -> dict[str, Any]:
+    """Descriptive statistics of the samples of one experiment, in the unit of the samples."""
+    values = np.asarray(samples, dtype=float)
+    ci_low, ci_high = bootstrap_confidence_interval(samples, seed=seed)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        "number_samples": len(values),
+        "mean": float(values.mean()),
+        "min": float(values.min()),
+        "median": float(p50),
+        "p90": float(p90),
+        "p99": float(p99),
+        "max": float(values.max()),
+        "std": float(values.std(ddof=1)) if len(values) > 1 else 0.0,
+        "ci_low": ci_low,
+        "ci_high": ci_high,
+        "confidence_level": DEFAULT_CONFIDENCE_LEVEL,
+        "outliers": find_outliers(samples),
+    }
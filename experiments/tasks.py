@@ -0,0 +1,82 @@
+from dataclasses import replace
+from typing import Any
+
+from celery import chord, shared_task
+from celery.result import AsyncResult
+from django.apps import apps
+
+from config.celery import NUMBER_PRIORITIES
+from experiments.models import ALL_INPUT_COLUMNS, ExperimentBase
+from experiments.results_store import start_run
+from experiments.runner import (
+    ExperimentOptions,
+    measure_cell,
+    new_explain_results,
+    new_results,
+    record_cell,
+    save_results,
+)
+
+
+@shared_task
+def run_experiment_cell(
+    input_size: int, input_columns: int, table_name: str, method_name: str, options: ExperimentOptions
+) -> dict[str, Any]:
+    """Measure one cell of the experiment matrix."""
+    experiment_table = apps.get_model("experiments", table_name)
+    cell = measure_cell(experiment_table, method_name, input_size, ALL_INPUT_COLUMNS[:input_columns], options)
+    return {**cell, "input_size": input_size, "input_columns": input_columns}
+
+
+@shared_task
+def aggregate_experiment_results(cells: list[dict[str, Any]], options: ExperimentOptions) -> list[int]:
+    """Chord callback: save the cells by input size and columns, as run_experiment does,
+    and return the ids of their configurations in the results store.
+    """
+    results_by_config: dict[tuple[int, int], tuple[dict, dict]] = {}
+    for cell in cells:
+        config = (cell["input_size"], cell["input_columns"])
+        if config not in results_by_config:
+            results = new_results(cell["input_size"], ALL_INPUT_COLUMNS[: cell["input_columns"]], options)
+            results_by_config[config] = (results, new_explain_results(results))
+        record_cell(*results_by_config[config], cell)
+
+    return [
+        save_results(results, explain_results, options, kind="celery")
+        for results, explain_results in results_by_config.values()
+    ]
+
+
+def distribute_experiments(
+    input_sizes: list[int], input_columns_list: list[int], options: ExperimentOptions
+) -> AsyncResult:
+    """Send one task per cell of the experiment matrix, and aggregate their results with a chord.
+
+    The most expensive cells, on the largest tables with the most inputs, get the highest priorities,
+    so that they do not start last and the sweep lasts about as long as its slowest cell.
+    The cells measured at the same time share the database: use as many workers as the database can serve
+    without contention.
+    """
+    if options.results_run_id is None:
+        # The configurations of the sweep are saved to the same run
+        options = replace(options, results_run_id=start_run("celery"))
+    experiment_methods = ExperimentBase.experiment_methods()
+    if options.reverse_order:
+        experiment_methods.reverse()
+    cells = [
+        (input_size, input_columns, experiment_table, method.__name__)
+        for input_size in input_sizes
+        for input_columns in input_columns_list
+        for method in experiment_methods
+        for experiment_table in ExperimentBase.submodels_by_size().values()
+    ]
+    # Priority 0 is consumed first
+    costs = sorted((cell[0] * cell[2]._max_count for cell in cells), reverse=True)
+    header = [
+        run_experiment_cell.signature(
+            (input_size, input_columns, experiment_table.__name__, method_name, options),
+            priority=costs.index(input_size * experiment_table._max_count) * NUMBER_PRIORITIES // len(cells),
+        )
+        for input_size, input_columns, experiment_table, method_name in cells
+    ]
+    return chord(header)(aggregate_experiment_results.s(options))
@@ -0,0 +1,45 @@
+import random
+from typing import Iterator
+
+import pytest
+from django.conf import settings as django_settings
+from django.db import connection
+
+from experiments.models import ALL_INPUT_COLUMNS, ExperimentBase
+
+
+@pytest.fixture(autouse=True)
+def data_dirs(settings, tmp_path) -> None:
+    """Keep the Bloom filters, columnar indexes and results store of the tests out of the working directory."""
+    settings.BLOOM_FILTER_DIR = tmp_path / "bloom_filters"
+    settings.COLUMNAR_INDEX_DIR = tmp_path / "columnar_index"
+    settings.RESULTS_STORE_PATH = tmp_path / "results.sqlite3"
+
+
+@pytest.fixture
+def pooled_profile() -> Iterator[None]:
+    """Connect the default database through the pool of the pooled profile, whatever the profile of the tests."""
+    settings_dict = connection.settings_dict
+    options = settings_dict.get("OPTIONS", {})
+    connection.close()
+    settings_dict["OPTIONS"] = {**options, **django_settings.POOLED_DB_OPTIONS}
+    try:
+        yield
+    finally:
+        connection.close()
+        connection.close_pool()  # type: ignore[attr-defined]
+        settings_dict["OPTIONS"] = options
+
+
+@pytest.fixture
+def experiment_inputs() -> tuple[type[ExperimentBase], list[str], list[tuple]]:
+    """Random table with random rows, random columns and inputs sampled from the rows.
+
+    The database is set up by the django_db mark of the test, with or without transactions.
+    """
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    random_rows = random.randint(1, 100)
+    experiment_table.bulk_generate_rows(number_of_rows=random_rows)
+    input_columns = ALL_INPUT_COLUMNS[: random.randint(2, 4)]
+    inputs = experiment_table.generate_inputs(random.randint(1, 20), input_columns, max_offset=random_rows)
+    return experiment_table, input_columns, inputs
@@ -0,0 +1,66 @@
+import random
+from http import HTTPStatus
+
+import orjson
+import pytest
+from django.test import Client
+
+from experiments.columnar import export_columnar_index
+from experiments.models import ALL_INPUT_COLUMNS, AUTO_STRATEGY_MAX_INLINE_INPUTS, ExperimentBase
+
+
+# Rows must be committed to be visible from the connections of the parallel chunks
+@pytest.mark.django_db(transaction=True)
+def test_filter_rows_endpoint(experiment_inputs, client: Client) -> None:
+    experiment_table, input_columns, inputs = experiment_inputs
+    table_size = next(size for size, table in ExperimentBase.submodels_by_size().items() if table is experiment_table)
+    expected_output = experiment_table.filter_rows_with_in_tuples(inputs, input_columns)
+    # Read by the columnar strategy
+    export_columnar_index(experiment_table, ALL_INPUT_COLUMNS, batch_size=random.randint(1, 100))
+
+    for strategy in [None, *experiment_table.filter_strategies()]:
+        payload = {"table_size": table_size, "columns": input_columns, "inputs": inputs, "strategy": strategy}
+        response = client.post("/experiments/filter", orjson.dumps(payload), content_type="application/json")
+        assert response.status_code == HTTPStatus.OK, response.content
+        result = orjson.loads(response.content)
+        assert result["average_age"] == expected_output
+        assert result["strategy"] == strategy or (strategy is None and result["strategy"] == "in_tuples")
+
+    # Long lists of inputs are sent as arrays by the auto strategy
+    long_inputs = inputs * (AUTO_STRATEGY_MAX_INLINE_INPUTS // len(inputs) + 1)
+    payload = {"table_size": table_size, "columns": input_columns, "inputs": long_inputs}
+    response = client.post("/experiments/filter", orjson.dumps(payload), content_type="application/json")
+    result = orjson.loads(response.content)
+    assert result["strategy"] == "unnest_arrays"
+    assert result["average_age"] == expected_output
+
+    invalid_payloads = [
+        {**payload, "table_size": "1M"},
+        {**payload, "strategy": "unknown"},
+        {**payload, "inputs": []},
+        {**payload, "columns": ["first_name", "first_name"], "inputs": [["John", "John"]]},
+        {**payload, "columns": ["last_name", "first_name"], "inputs": [["Doe", "John"]]},
+        {**payload, "columns": ["first_name"], "inputs": [["John"]]},
+        {**payload, "table_size": [table_size]},
+        {**payload, "columns": ["first_name", "last_name", "age"], "inputs": [["John", "Doe", "x"]]},
+        {**payload, "columns": ["first_name", "last_name", "age"], "inputs": [["John", "Doe", True]]},
+        {**payload, "columns": ["first_name", "last_name"], "inputs": [["John", 1]]},
+        {**payload, "columns": ["first_name", "last_name"], "inputs": [["John", None]]},
+        {**payload, "inputs": [[1] * len(input_columns)] * len(long_inputs)},
+        [1],
+    ]
+    for invalid_payload in invalid_payloads:
+        response = client.post("/experiments/filter", orjson.dumps(invalid_payload), content_type="application/json")
+        assert response.status_code == HTTPStatus.BAD_REQUEST, invalid_payload
+
+    # Values out of the range of their column are rejected by the database, with every strategy
+    out_of_range_payload = {
+        "table_size": table_size,
+        "columns": ["first_name", "last_name", "age"],
+        "inputs": [["John", "Doe", 2**40]],
+    }
+    for strategy in experiment_table.filter_strategies():
+        payload = {**out_of_range_payload, "strategy": strategy}
+        response = client.post("/experiments/filter", orjson.dumps(payload), content_type="application/json")
+        assert response.status_code in {HTTPStatus.OK, HTTPStatus.BAD_REQUEST}, (strategy, response.content)
+    assert client.get("/experiments/filter").status_code == HTTPStatus.METHOD_NOT_ALLOWED
@@ -0,0 +1,47 @@
+import asyncio
+
+import psycopg
+import pytest
+
+from experiments.async_runner import async_connection_kwargs, run_async_experiment
+from experiments.models import ExperimentBase
+from experiments.results_store import query_samples
+from experiments.runner import ExperimentOptions
+
+
+async def run_async_methods(
+    experiment_table: type[ExperimentBase], inputs: list[tuple], input_columns: list[str]
+) -> list[float | None]:
+    async with await psycopg.AsyncConnection.connect(**async_connection_kwargs()) as aconnection:
+        return [
+            await method(aconnection, inputs, input_columns) for method in experiment_table.async_experiment_methods()
+        ]
+
+
+# Rows must be committed to be visible from the async connection
+@pytest.mark.django_db(transaction=True)
+def test_same_output_for_async_experiment_methods(experiment_inputs) -> None:
+    experiment_table, input_columns, inputs = experiment_inputs
+    expected_output = experiment_table.filter_rows_with_in_tuples(inputs, input_columns)
+
+    outputs = asyncio.run(run_async_methods(experiment_table, inputs, input_columns))
+    assert len(outputs) == len(experiment_table.async_experiment_methods())
+    assert set(outputs) == {expected_output}, f"Async outputs differ from the sync output: {outputs=}"
+
+    # No row can match empty inputs
+    assert asyncio.run(run_async_methods(experiment_table, [], input_columns))[0] is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_async_experiment_saves_to_the_results_store(experiment_inputs, monkeypatch: pytest.MonkeyPatch) -> None:
+    experiment_table, _, _ = experiment_inputs
+    table_size = next(size for size, table in ExperimentBase.submodels_by_size().items() if table is experiment_table)
+    monkeypatch.setattr(ExperimentBase, "submodels_by_size", classmethod(lambda cls: {table_size: experiment_table}))
+
+    run_async_experiment(5, 2, ExperimentOptions(number_runs=2, warmup_runs=0), in_flight=2)
+    samples = query_samples(kind="async", table_name=experiment_table.__name__)
+    # Recorded under the names of the sync methods
+    assert {sample["method_name"] for sample in samples} == {
+        method.__name__.removeprefix("a") for method in experiment_table.async_experiment_methods()
+    }
+    assert {sample["dimensions"]["in_flight"] for sample in samples} == {2}
@@ -0,0 +1,61 @@
+import random
+from collections import Counter
+
+import pytest
+
+from experiments.bloom import BloomFilter, bloom_filter_path, prefiltered_method
+from experiments.models import ALL_INPUT_COLUMNS, ExperimentBase
+from experiments.utils import FakeProfileGenerator, generate_random_inputs, key_column_prefixes
+
+BLOOM_FILTER_CAPACITY = 1_000
+MAX_FALSE_POSITIVE_RATE = 0.05
+
+
+def test_bloom_filter_has_no_false_negatives(tmp_path) -> None:
+    bloom_filter = BloomFilter.create(tmp_path / "test.bloom", BLOOM_FILTER_CAPACITY, 0.01)
+    profile_generator = FakeProfileGenerator()
+    keys = generate_random_inputs(BLOOM_FILTER_CAPACITY, ALL_INPUT_COLUMNS, profile_generator)
+    bloom_filter.add(keys)
+    assert bloom_filter.contains(keys).all()
+
+    # Reopened from the file, as by another process
+    other_keys = [
+        (*key, "absent")
+        for key in generate_random_inputs(10 * BLOOM_FILTER_CAPACITY, ALL_INPUT_COLUMNS, profile_generator)
+    ]
+    assert BloomFilter(tmp_path / "test.bloom").contains(other_keys).mean() < MAX_FALSE_POSITIVE_RATE
+    statistics = bloom_filter.statistics()
+    assert statistics["estimated_false_positive_rate"] < MAX_FALSE_POSITIVE_RATE
+    assert statistics["memory_bytes"] > statistics["number_of_bits"] // 8
+
+
+@pytest.mark.django_db
+def test_prefiltered_method_drops_absent_inputs(experiment_inputs) -> None:
+    experiment_table, input_columns, inputs = experiment_inputs
+    assert bloom_filter_path(experiment_table, input_columns).exists()
+    absent_inputs = [(*input_tuple[:-1], "absent") for input_tuple in inputs]
+    counters: Counter = Counter()
+    method = prefiltered_method(experiment_table, experiment_table.filter_rows_with_in_tuples, counters)
+    assert method(inputs + absent_inputs, input_columns) == experiment_table.filter_rows_with_conditions(
+        inputs, input_columns
+    )
+    assert method(absent_inputs, input_columns) is None
+    assert counters["checked_inputs"] == len(inputs) + 2 * len(absent_inputs)
+    assert counters["dropped_inputs"] >= len(inputs)
+
+
+@pytest.mark.django_db
+def test_bloom_filters_are_created_with_the_first_rows() -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    experiment_table.bulk_generate_rows(number_of_rows=random.randint(1, 100), bulk_size=random.randint(1, 10))
+    keys = list(experiment_table.objects.values_list(*ALL_INPUT_COLUMNS))
+    for columns in key_column_prefixes(ALL_INPUT_COLUMNS):
+        bloom_filter = BloomFilter(bloom_filter_path(experiment_table, columns))
+        assert bloom_filter.contains([key[: len(columns)] for key in keys]).all()
+
+    # Loads without them discard the filters, which are not created again by the next loads
+    experiment_table.bulk_generate_rows(number_of_rows=random.randint(1, 10), bloom_filters=False)
+    experiment_table.bulk_generate_rows(number_of_rows=random.randint(1, 10))
+    assert not any(
+        bloom_filter_path(experiment_table, columns).exists() for columns in key_column_prefixes(ALL_INPUT_COLUMNS)
+    )
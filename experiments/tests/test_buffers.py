@@ -0,0 +1,24 @@
+import random
+
+import pytest
+
+from experiments.buffers import PG_BUFFERCACHE_EVICT_VERSION, evict_buffers, relation_names, server_version
+from experiments.models import ExperimentBase
+
+
+@pytest.mark.django_db
+def test_evict_buffers() -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    table_relations = relation_names(experiment_table)
+    if experiment_table._partitioned:
+        assert f"{experiment_table._meta.db_table}_p0" in table_relations
+    else:
+        assert table_relations[0] == f'"{experiment_table._meta.db_table}"'
+        assert f"{experiment_table.__name__.lower()}_name_index" in table_relations
+
+    experiment_table.bulk_generate_rows(number_of_rows=random.randint(1, 100))
+    evicted_buffers = evict_buffers(experiment_table)
+    if server_version() < PG_BUFFERCACHE_EVICT_VERSION:
+        assert evicted_buffers is None
+    else:
+        assert evicted_buffers is not None and evicted_buffers > 0
@@ -0,0 +1,70 @@
+import random
+from collections import Counter
+from typing import cast
+
+import pytest
+from redis import Redis
+
+from config.redis import REDIS_CACHE_DB, get_redis_client
+from experiments.bloom import BloomFilter, bloom_filter_path
+from experiments.cache import cache_key, cached_method, table_version_key
+from experiments.models import ALL_INPUT_COLUMNS, ExperimentBase
+
+
+@pytest.mark.django_db
+def test_cached_method_is_invalidated_by_writes(experiment_inputs) -> None:
+    experiment_table, input_columns, inputs = experiment_inputs
+
+    # The key only depends on the set of inputs
+    shuffled_inputs = random.sample(inputs, len(inputs)) + inputs[:1]
+    assert cache_key(experiment_table, inputs, input_columns) == cache_key(
+        experiment_table, shuffled_inputs, input_columns
+    )
+
+    counters: Counter = Counter()
+    method = cached_method(experiment_table, experiment_table.filter_rows_with_in_tuples, counters)
+    expected_output = experiment_table.filter_rows_with_conditions(inputs, input_columns)
+    assert method(inputs, input_columns) == expected_output
+    assert method(shuffled_inputs, input_columns) == expected_output
+    assert counters == {"hits": 1, "misses": 1}
+
+    experiment_table.bulk_generate_rows(number_of_rows=1)
+    assert method(inputs, input_columns) == experiment_table.filter_rows_with_conditions(inputs, input_columns)
+    assert counters == {"hits": 1, "misses": 2}
+
+
+@pytest.mark.django_db
+def test_rows_are_loaded_without_redis(monkeypatch: pytest.MonkeyPatch) -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    # Nothing listens on port 1
+    monkeypatch.setattr("experiments.cache.get_redis_client", lambda db: Redis(host="127.0.0.1", port=1, db=db))
+    number_of_rows = random.randint(1, 100)
+    experiment_table.bulk_generate_rows(number_of_rows=number_of_rows, bulk_size=random.randint(1, 10))
+    assert experiment_table.objects.count() == number_of_rows
+
+    # The Bloom filters hold every loaded row
+    input_columns = ALL_INPUT_COLUMNS[:2]
+    keys = list(experiment_table.objects.values_list(*input_columns))
+    assert BloomFilter(bloom_filter_path(experiment_table, input_columns)).contains(keys).all()
+
+
+@pytest.mark.django_db
+def test_failed_load_invalidates_cached_results(monkeypatch: pytest.MonkeyPatch) -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    version_key = table_version_key(experiment_table)
+    version = int(cast(bytes | None, get_redis_client(db=REDIS_CACHE_DB).get(version_key)) or 0)
+
+    # The second batch fails after the first one was committed
+    batches: list[tuple] = []
+
+    def add_to_bloom_filters(*args, **kwargs) -> None:
+        if batches:
+            raise OSError("Disk full")
+        batches.append(args)
+
+    monkeypatch.setattr("experiments.models.add_to_bloom_filters", add_to_bloom_filters)
+    bulk_size = random.randint(1, 10)
+    with pytest.raises(OSError, match="Disk full"):
+        experiment_table.bulk_generate_rows(number_of_rows=2 * bulk_size, bulk_size=bulk_size)
+    assert experiment_table.objects.count() == bulk_size
+    assert int(cast(bytes | None, get_redis_client(db=REDIS_CACHE_DB).get(version_key)) or 0) > version
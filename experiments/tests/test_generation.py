@@ -0,0 +1,56 @@
+import random
+
+import pytest
+from django.db import connection
+
+from experiments.bloom import BloomFilter, bloom_filter_path
+from experiments.generation import generate_rows_in_parallel, generate_rows_range, plan_generation_ranges
+from experiments.models import ExperimentBase, GenerationRange
+
+GENERATION_OPTIONS = {"bulk_size": 3, "engine": "copy", "generator": "numpy", "seed": 42}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_generation_resumes_from_checkpoints() -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    number_of_rows = random.randint(10, 50)
+    generation_ranges = plan_generation_ranges(experiment_table, 2, number_of_rows)
+    assert [(r.range_start, r.range_end) for r in generation_ranges] == [
+        (0, (number_of_rows + 1) // 2),
+        ((number_of_rows + 1) // 2, number_of_rows),
+    ]
+
+    # Simulate an interrupted load: only the first range is complete
+    generate_rows_range(generation_ranges[0].pk, **GENERATION_OPTIONS)
+    resumed_ranges = plan_generation_ranges(experiment_table, 2, number_of_rows)
+    assert [r.pk for r in resumed_ranges] == [generation_ranges[1].pk]
+
+    generate_rows_in_parallel([experiment_table], 2, number_of_rows, **GENERATION_OPTIONS)
+    assert experiment_table.objects.count() == number_of_rows
+    assert all(r.rows_remaining == 0 for r in GenerationRange.objects.filter(table_name=experiment_table.__name__))
+
+    # A new load is planned from the current count once the previous one is complete
+    new_ranges = plan_generation_ranges(experiment_table, 2, 1)
+    assert [(r.range_start, r.range_end) for r in new_ranges] == [(number_of_rows, number_of_rows + 1)]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_generation_with_pooled_connections(pooled_profile: None) -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    number_of_rows = random.randint(10, 50)
+    input_columns = ["first_name", "last_name"]
+    prepare_threshold = connection.settings_dict["OPTIONS"]["prepare_threshold"]
+    # Prepared on the server by the sessions of the pool
+    for _ in range(prepare_threshold + 1):
+        assert experiment_table.filter_rows_with_in_tuples([("First", "Last")], input_columns) is None
+    parent_pool = connection.pool  # type: ignore[attr-defined]
+
+    generate_rows_in_parallel([experiment_table], 2, number_of_rows, **GENERATION_OPTIONS)
+    # The workers did not inherit the sessions of the parent pool
+    assert parent_pool.closed
+    assert experiment_table.objects.count() == number_of_rows
+    for _ in range(prepare_threshold + 1):
+        assert experiment_table.filter_rows_with_in_tuples([("First", "Last")], input_columns) is None
+    # The filters created before forking hold the rows of all workers
+    keys = list(experiment_table.objects.values_list(*input_columns))
+    assert BloomFilter(bloom_filter_path(experiment_table, input_columns)).contains(keys).all()
@@ -0,0 +1,26 @@
+import random
+
+import pytest
+from django.db import connection
+
+from experiments.indexes import INDEX_VARIANTS, index_variant
+
+
+@pytest.mark.django_db(transaction=True)
+def test_index_variant_is_created_and_dropped(experiment_inputs) -> None:
+    experiment_table, input_columns, inputs = experiment_inputs
+    variant = random.choice([variant for variant, indexes in INDEX_VARIANTS.items() if indexes])
+    expected_output = experiment_table.filter_rows_with_conditions(inputs, input_columns)
+
+    def table_indexes() -> set[str]:
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, experiment_table._meta.db_table))
+
+    with index_variant(variant) as index_builds:
+        builds = index_builds[experiment_table.__name__]
+        assert len(builds) == len(INDEX_VARIANTS[variant])
+        assert all(build["size_bytes"] > 0 and build["build_ms"] > 0 for build in builds.values())
+        assert set(builds) <= table_indexes()
+        assert experiment_table.filter_rows_with_in_tuples(inputs, input_columns) == expected_output
+
+    assert not set(builds) & table_indexes()
@@ -0,0 +1,48 @@
+import pytest
+
+from experiments.instrumentation import capture_explain_plans, capture_phases
+
+
+@pytest.mark.django_db
+def test_capture_explain_plans(experiment_inputs) -> None:
+    experiment_table, input_columns, inputs = experiment_inputs
+
+    for method in experiment_table.experiment_methods():
+        if method.__name__ == "filter_rows_with_parallel_chunks":
+            # Its queries run on the connections of other threads
+            continue
+
+        with capture_explain_plans() as plans:
+            output = method(inputs, input_columns)
+
+        # The plan is captured without changing the result of the query
+        assert output == method(inputs, input_columns)
+        assert len(plans) == 1, f"{method.__name__} should run a single SELECT query: {plans=}"
+        assert plans[0]["sql"].startswith("SELECT")
+        assert plans[0]["planning_time_ms"] >= 0
+        assert plans[0]["execution_time_ms"] >= 0
+        assert plans[0]["node_types"][0] == "Aggregate"
+
+
+@pytest.mark.django_db
+def test_capture_phases(experiment_inputs) -> None:
+    experiment_table, input_columns, inputs = experiment_inputs
+
+    with capture_phases() as phases:
+        output = experiment_table.filter_rows_with_in_tuples(inputs, input_columns)
+
+    assert output == experiment_table.filter_rows_with_in_tuples(inputs, input_columns)
+    assert phases["queries"] == 1
+    assert phases["compile_ms"] > 0
+    assert phases["execute_ms"] > 0
+    assert phases["sql_length"] > 0
+    # One parameter per value of the inputs, distinct or not
+    assert phases["bind_params"] == len(inputs) * len(input_columns)
+
+    # The compilers are restored on exit
+    with capture_phases() as phases:
+        experiment_table.filter_rows_with_unnest_arrays(inputs, input_columns)
+    experiment_table.filter_rows_with_in_tuples(inputs, input_columns)
+    assert phases["queries"] == 1
+    assert phases["compile_ms"] == 0
+    assert phases["bind_params"] == len(input_columns)
@@ -0,0 +1,52 @@
+import random
+import time
+
+import orjson
+import pytest
+
+from experiments.load import run_api_load, run_load_experiment, send_filter_requests
+from experiments.models import ExperimentBase
+from experiments.results_store import DURATION_MEASURE, query_samples
+from experiments.runner import ExperimentOptions
+
+LOAD_DURATION_SECONDS = 0.5
+
+
+# Rows must be committed to be visible from the client processes
+@pytest.mark.django_db(transaction=True)
+def test_run_load_experiment(experiment_inputs, monkeypatch: pytest.MonkeyPatch) -> None:
+    # The load runner draws its own inputs from the rows
+    experiment_table, _, _ = experiment_inputs
+    table_size = next(size for size, table in ExperimentBase.submodels_by_size().items() if table is experiment_table)
+    method_name = random.choice(ExperimentBase.experiment_methods()).__name__
+    # A single cell of the matrix, with a shorter start
+    monkeypatch.setattr(ExperimentBase, "submodels_by_size", classmethod(lambda cls: {table_size: experiment_table}))
+    monkeypatch.setattr(ExperimentBase, "experiment_methods", classmethod(lambda cls: [getattr(cls, method_name)]))
+    monkeypatch.setattr("experiments.load.LOAD_START_DELAY_SECONDS", 0.5)
+
+    results = run_load_experiment(5, 2, ExperimentOptions(), concurrency=2, duration=LOAD_DURATION_SECONDS)
+    load_results = results[experiment_table.__name__][method_name]
+    samples = query_samples(kind="load", table_name=experiment_table.__name__, method_name=method_name)
+    assert load_results["queries"] > 0
+    assert len(samples) == load_results["queries"]
+    assert {sample["measure"] for sample in samples} == {DURATION_MEASURE}
+    assert load_results["queries_per_second"] == load_results["queries"] / LOAD_DURATION_SECONDS
+    assert 0 < load_results["p50_ms"] <= load_results["p95_ms"] <= load_results["p99_ms"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_run_api_load(experiment_inputs, live_server) -> None:
+    experiment_table, input_columns, inputs = experiment_inputs
+    table_size = next(size for size, table in ExperimentBase.submodels_by_size().items() if table is experiment_table)
+    bodies = [orjson.dumps({"table_size": table_size, "columns": input_columns, "inputs": inputs})]
+    url = f"{live_server.url}/experiments/filter"
+
+    results = run_api_load(url, bodies, concurrency=2, duration=LOAD_DURATION_SECONDS)
+    assert results["queries"] > 0
+    assert results["errors"] == 0
+    assert 0 < results["p50_ms"] <= results["p95_ms"] <= results["p99_ms"]
+
+    # Rejected requests are errors, without latency
+    latencies_ms, errors = send_filter_requests(url, [b"[]"], time.monotonic() + LOAD_DURATION_SECONDS)
+    assert not latencies_ms
+    assert errors > 0
@@ -1,21 +1,25 @@
 import random
 
 import pytest
+from django.db.models import Q
 
-from experiments.models import ALL_INPUT_COLUMNS, ExperimentBase
+from experiments.columnar import export_columnar_index
+from experiments.models import (
+    ALL_INPUT_COLUMNS,
+    BULK_ENGINES,
+    INPUT_SAMPLING_MODES,
+    ORM_QUERYSET_BUILDERS,
+    ExperimentBase,
+    KeySummary,
+)
+from experiments.utils import PROFILE_GENERATORS
 
 
-@pytest.mark.django_db
-def test_same_output_for_experiment_methods() -> None:
-    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
-    # Generate random rows
-    random_rows = random.randint(1, 100)
-    experiment_table.bulk_generate_rows(number_of_rows=random_rows)
-
-    # Test with random inputs
-    random_input_size = random.randint(1, 20)
-    input_columns = ALL_INPUT_COLUMNS[: random.randint(2, 4)]
-    inputs = experiment_table.generate_inputs(random_input_size, input_columns, max_offset=random_rows)
+# Rows must be committed to be visible from the connections of the parallel chunks
+@pytest.mark.django_db(transaction=True)
+def test_same_output_for_experiment_methods(experiment_inputs) -> None:
+    # Test with random inputs of random rows
+    experiment_table, input_columns, inputs = experiment_inputs
     outputs = []
     for method in experiment_table.experiment_methods():
         outputs.append(method(inputs, input_columns))
@@ -25,3 +29,139 @@ def test_same_output_for_experiment_methods() -> None:
         f"Different number of outputs than experiment methods: {len(outputs)=} | {number_methods=}"
     )
     assert len(set(outputs)) == 1, f"Outputs are not exactly the same: {outputs=}"
+    # No row can match empty inputs
+    assert {method([], input_columns) for method in experiment_table.experiment_methods()} == {None}
+
+    # Summaries are maintained with each inserted batch
+    assert experiment_table.filter_rows_with_key_summary(
+        inputs, input_columns
+    ) == experiment_table.filter_rows_with_in_tuples(inputs, input_columns)
+
+    # The columnar engine answers from an export of the table
+    export_columnar_index(experiment_table, ALL_INPUT_COLUMNS, batch_size=random.randint(1, 100))
+    assert experiment_table.filter_rows_with_columnar(
+        inputs, input_columns
+    ) == experiment_table.filter_rows_with_in_tuples(inputs, input_columns)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_chunks_count_duplicate_inputs_once(experiment_inputs) -> None:
+    experiment_table, input_columns, inputs = experiment_inputs
+    # Duplicates would fall in different chunks if they were not removed first
+    duplicated_inputs = inputs + inputs[::-1]
+    assert experiment_table.filter_rows_with_parallel_chunks(
+        duplicated_inputs, input_columns, number_of_chunks=3
+    ) == experiment_table.filter_rows_with_in_tuples(inputs, input_columns)
+    assert experiment_table.filter_rows_with_parallel_chunks([], input_columns) is None
+
+
+@pytest.mark.django_db
+def test_flat_conditions_match_combined_conditions(experiment_inputs) -> None:
+    experiment_table, input_columns, inputs = experiment_inputs
+
+    combined_conditions = Q()
+    for input_tuple in inputs:
+        combined_conditions |= Q(**dict(zip(input_columns, input_tuple, strict=True)))
+    flat_conditions = experiment_table._conditions(inputs, input_columns)
+    if len(inputs) > 1:
+        # A single condition is not wrapped in an OR by |=, but compiles to the same SQL
+        assert flat_conditions == combined_conditions
+    assert str(experiment_table.objects.filter(flat_conditions).query) == str(
+        experiment_table.objects.filter(combined_conditions).query
+    )
+
+    for method_name in ORM_QUERYSET_BUILDERS:
+        average_age, phases = experiment_table.time_orm_phases(method_name, inputs, input_columns)
+        assert average_age == getattr(experiment_table, method_name)(inputs, input_columns)
+        assert set(phases) == {"build_ms", "compile_ms", "execute_ms"}
+        assert all(duration_ms >= 0 for duration_ms in phases.values())
+
+
+@pytest.mark.django_db
+def test_key_summary_batches_match_rebuild() -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    experiment_table.bulk_generate_rows(number_of_rows=random.randint(1, 100), bulk_size=random.randint(1, 10))
+    # Repeated keys, with and without email
+    profiles = list(experiment_table.objects.values(*ALL_INPUT_COLUMNS)[: random.randint(1, 10)])
+    experiment_table.insert_profiles(profiles + [{**profile, "email": None} for profile in profiles])
+
+    summaries = KeySummary.objects.filter(table_name=experiment_table.__name__).values_list(
+        "number_of_columns", *ALL_INPUT_COLUMNS, "sum_age", "count"
+    )
+    incremental_summaries = set(summaries)
+    KeySummary.rebuild(experiment_table)
+    assert set(summaries.all()) == incremental_summaries
+    statistics = KeySummary.statistics(experiment_table, ALL_INPUT_COLUMNS)
+    assert statistics["table_rows"] == experiment_table.objects.count()
+
+
+@pytest.mark.django_db
+def test_null_keys_never_match() -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    experiment_table.bulk_generate_rows(number_of_rows=random.randint(1, 100))
+    profiles = list(experiment_table.objects.values(*ALL_INPUT_COLUMNS)[: random.randint(1, 10)])
+    experiment_table.insert_profiles([{**profile, "email": None} for profile in profiles])
+    export_columnar_index(experiment_table, ALL_INPUT_COLUMNS, batch_size=random.randint(1, 20))
+
+    # Inputs with a None email match neither the rows with a NULL email nor the string "None"
+    inputs = [(*key, None) for key in experiment_table.objects.values_list(*ALL_INPUT_COLUMNS[:3])]
+    inputs += [(*input_tuple[:3], "None") for input_tuple in inputs]
+    assert experiment_table.filter_rows_with_in_tuples(inputs, ALL_INPUT_COLUMNS) is None
+    assert experiment_table.filter_rows_with_columnar(inputs, ALL_INPUT_COLUMNS) is None
+    # The rows with a NULL email still match on the shorter prefixes
+    assert experiment_table.filter_rows_with_columnar(
+        [input_tuple[:3] for input_tuple in inputs], ALL_INPUT_COLUMNS[:3]
+    ) == experiment_table.filter_rows_with_in_tuples([input_tuple[:3] for input_tuple in inputs], ALL_INPUT_COLUMNS[:3])
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("engine", BULK_ENGINES)
+@pytest.mark.parametrize("generator", PROFILE_GENERATORS)
+def test_bulk_generate_rows_respects_limits(engine: str, generator: str, monkeypatch: pytest.MonkeyPatch) -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    number_of_rows = random.randint(1, 100)
+    experiment_table.bulk_generate_rows(number_of_rows=number_of_rows, bulk_size=7, engine=engine, generator=generator)
+    assert experiment_table.objects.count() == number_of_rows
+    assert not experiment_table.objects.filter(created_at__isnull=True).exists()
+
+    # Never generate more rows than the maximum count of the table
+    monkeypatch.setattr(experiment_table, "_max_count", number_of_rows + 3)
+    experiment_table.bulk_generate_rows(number_of_rows=100, engine=engine)
+    assert experiment_table.objects.count() == number_of_rows + 3
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("sampling", INPUT_SAMPLING_MODES)
+def test_generate_inputs_samples_existing_rows(sampling: str) -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    number_of_rows = random.randint(20, 100)
+    experiment_table.bulk_generate_rows(number_of_rows=number_of_rows, generator="numpy")
+
+    input_size = random.randint(1, 20)
+    inputs = experiment_table.generate_inputs(
+        input_size, ALL_INPUT_COLUMNS, max_offset=number_of_rows, fake_percent=0, sampling=sampling
+    )
+    assert len(inputs) == input_size
+    assert set(inputs) <= set(experiment_table.objects.values_list(*ALL_INPUT_COLUMNS))
+
+
+@pytest.mark.django_db
+def test_key_summaries_stay_in_sync_with_rows(monkeypatch: pytest.MonkeyPatch) -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    number_of_rows = random.randint(1, 100)
+    experiment_table.bulk_generate_rows(number_of_rows=number_of_rows)
+
+    # A failed batch leaves neither its rows nor their summaries
+    def fail(*args, **kwargs) -> None:
+        raise OSError("Disk full")
+
+    monkeypatch.setattr("experiments.models.add_to_bloom_filters", fail)
+    with pytest.raises(OSError, match="Disk full"):
+        experiment_table.bulk_generate_rows(number_of_rows=random.randint(1, 10))
+    monkeypatch.undo()
+    assert experiment_table.objects.count() == number_of_rows
+    assert KeySummary.statistics(experiment_table, ALL_INPUT_COLUMNS)["table_rows"] == number_of_rows
+
+    # Loads without summaries discard the summaries of the table
+    experiment_table.bulk_generate_rows(number_of_rows=random.randint(1, 10), key_summaries=False)
+    assert not KeySummary.objects.filter(table_name=experiment_table.__name__).exists()
@@ -0,0 +1,47 @@
+import random
+
+import pytest
+from django.db import connection
+
+from experiments.models import ALL_INPUT_COLUMNS, ExperimentBase
+from experiments.results_store import DURATION_MEASURE, get_run, query_samples, save_configuration, start_run
+
+
+@pytest.mark.django_db
+def test_results_store_appends_samples_with_run_metadata() -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    number_of_rows = random.randint(1, 20)
+    experiment_table.bulk_generate_rows(number_of_rows=number_of_rows)
+    table_name = experiment_table.__name__
+    durations_ms = [random.random() for _ in range(random.randint(1, 10))]
+    phases = {"compile_ms": [random.random() for _ in durations_ms]}
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {connection.ops.quote_name(experiment_table._meta.db_table)}")
+    run_id = start_run("sync")
+    run = get_run(run_id)
+    # Exact on small tables, as ANALYZE reads all their rows
+    assert run["estimated_table_rows"][table_name] == number_of_rows
+    assert "shared_buffers" in run["server_settings"]
+    configuration_ids = []
+    for cache_mode in ["warm", "cold"]:
+        results = {
+            "input_size": 10,
+            "columns": ALL_INPUT_COLUMNS[:2],
+            "cache_mode": cache_mode,
+            table_name: {"filter_rows_with_in_tuples": sum(durations_ms) / len(durations_ms)},
+            "samples": {table_name: {"filter_rows_with_in_tuples": durations_ms}},
+            "phase_timings": {table_name: {"filter_rows_with_in_tuples": phases}},
+        }
+        configuration_ids.append(save_configuration(results, run_id, "sync"))
+
+    samples = query_samples(cache_mode="cold", measure=DURATION_MEASURE)
+    assert [sample["value"] for sample in samples] == durations_ms
+    assert {sample["configuration_id"] for sample in samples} == {configuration_ids[1]}
+    assert samples[0]["dimensions"]["number_of_columns"] == len(ALL_INPUT_COLUMNS[:2])
+    assert samples[0]["postgres_version"]
+    assert len(query_samples(run_id=run_id, columns=ALL_INPUT_COLUMNS[:2])) == 2 * 2 * len(durations_ms)
+    assert [sample["value"] for sample in query_samples(cache_mode="warm", measure="phase_timings.compile_ms")] == (
+        phases["compile_ms"]
+    )
+    assert not query_samples(cache_mode="cold", input_size=20)
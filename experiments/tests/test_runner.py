@@ -0,0 +1,42 @@
+import random
+from typing import Any
+
+import pytest
+
+from experiments.models import ALL_INPUT_COLUMNS, ExperimentBase, KeySummary
+from experiments.runner import ExperimentOptions, measure_cell, record_key_summary
+
+
+@pytest.mark.django_db
+def test_key_summaries_are_counted_once_per_table(monkeypatch: pytest.MonkeyPatch) -> None:
+    experiment_table = random.choice(list(ExperimentBase.submodels_by_size().values()))
+    experiment_table.bulk_generate_rows(number_of_rows=random.randint(1, 100))
+    statistics = KeySummary.statistics
+    counted_columns = []
+
+    def count_summaries(experiment_table: type[ExperimentBase], input_columns: list[str]) -> dict[str, Any]:
+        counted_columns.append(input_columns)
+        return statistics(experiment_table, input_columns)
+
+    monkeypatch.setattr(KeySummary, "statistics", count_summaries)
+    monkeypatch.setattr("experiments.runner._key_summary_statistics", {})
+    table_name = experiment_table.__name__
+    timings = {table_name: {"filter_rows_with_in_tuples": 2.0, "filter_rows_with_key_summary": 1.0}}
+    for input_size in [1, 10, 100]:
+        for columns in [ALL_INPUT_COLUMNS[:2], ALL_INPUT_COLUMNS[:3]]:
+            results: dict[str, Any] = {"input_size": input_size, "columns": columns, "key_summaries": {}, **timings}
+            record_key_summary(results, experiment_table)
+            assert results["key_summaries"][table_name]["table_rows"] == experiment_table.objects.count()
+            assert results["key_summaries"][table_name]["speedup"] == 2.0  # noqa: PLR2004
+
+    assert counted_columns == [ALL_INPUT_COLUMNS[:2], ALL_INPUT_COLUMNS[:3]]
+
+
+@pytest.mark.django_db
+def test_cached_results_are_measured_on_replayed_inputs(experiment_inputs) -> None:
+    experiment_table, input_columns, _ = experiment_inputs
+    options = ExperimentOptions(number_runs=3, warmup_runs=1, cache_results=True, cached_input_sets=1)
+    cell = measure_cell(experiment_table, "filter_rows_with_in_tuples", 5, input_columns, options)
+    # Only the warm-up run misses the cache
+    assert cell["result_cache"] == {"hits": 3, "misses": 1, "hit_ratio": 0.75}
+    assert len(cell["durations_ms"]) == options.number_runs
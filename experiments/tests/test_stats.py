@@ -0,0 +1,29 @@
+import random
+
+import pytest
+
+from experiments.stats import bootstrap_confidence_interval, find_outliers, summarize_samples
+
+
+def test_find_outliers() -> None:
+    random_generator = random.Random(0)
+    samples = [random_generator.uniform(10, 11) for _ in range(50)]
+    samples[7] = 100.0  # Checkpoint stall
+    assert find_outliers(samples) == [7]
+
+
+def test_summarize_samples() -> None:
+    samples = [float(value) for value in range(1, 101)]
+    statistics = summarize_samples(samples, seed=42)
+    assert statistics["number_samples"] == len(samples)
+    assert statistics["min"] == samples[0]
+    assert statistics["max"] == samples[-1]
+    assert statistics["median"] == pytest.approx(50.5)
+    assert statistics["p90"] == pytest.approx(90.1)
+    assert statistics["p99"] == pytest.approx(99.01)
+    assert statistics["ci_low"] < statistics["mean"] < statistics["ci_high"]
+    assert statistics["outliers"] == []
+
+    # The confidence interval narrows with the number of samples
+    ci_low, ci_high = bootstrap_confidence_interval(samples * 10, seed=42)
+    assert ci_high - ci_low < statistics["ci_high"] - statistics["ci_low"]
@@ -0,0 +1,40 @@
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from experiments.models import ExperimentBase
+from experiments.results_store import DURATION_MEASURE, query_samples
+from experiments.runner import ExperimentOptions
+from experiments.tasks import distribute_experiments
+
+
+@pytest.mark.django_db
+def test_distribute_experiments(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    for experiment_table in ExperimentBase.submodels_by_size().values():
+        experiment_table.bulk_generate_rows(number_of_rows=random.randint(1, 20))
+
+    # Tasks are executed eagerly in tests
+    options = ExperimentOptions(number_runs=2, warmup_runs=0, json_files=True)
+    configuration_ids = distribute_experiments([5, 10], [2], options).get()
+    assert len(configuration_ids) == len(set(configuration_ids)) == 2  # noqa: PLR2004
+
+    method_names = [method.__name__ for method in ExperimentBase.experiment_methods()]
+    samples = query_samples(kind="celery", input_size=5, measure=DURATION_MEASURE)
+    assert {sample["configuration_id"] for sample in samples} == {configuration_ids[0]}
+    assert len({sample["run_id"] for sample in query_samples(kind="celery")}) == 1
+    for experiment_table in ExperimentBase.submodels_by_size().values():
+        table_name = experiment_table.__name__
+        for method_name in method_names:
+            method_samples = [
+                sample
+                for sample in samples
+                if sample["table_name"] == table_name and sample["method_name"] == method_name
+            ]
+            assert len(method_samples) == options.number_runs
+
+    # The JSON files are still saved on demand
+    results = json.loads((tmp_path / "experiments_2runs_10fake_5size_2cols.json").read_text())
+    assert list(results[ExperimentBase.submodels_by_size()["5M"].__name__]) == method_names
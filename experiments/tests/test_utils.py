@@ -0,0 +1,44 @@
+import random
+
+import pytest
+from django.db import connection
+
+from experiments.utils import MAX_AGE, MIN_AGE, FakeProfileGenerator, generate_fake_profile, numeric_average
+
+
+def test_fake_profile_generator_is_seeded() -> None:
+    profiles = FakeProfileGenerator(seed=42).generate_profiles(100)
+    assert profiles == FakeProfileGenerator(seed=42).generate_profiles(100)
+    assert profiles != FakeProfileGenerator(seed=43).generate_profiles(100)
+
+
+def test_fake_profile_generator_matches_faker_profiles() -> None:
+    profile_generator = FakeProfileGenerator(seed=42, batch_size=300)
+    batches = list(profile_generator.iter_profiles(1000))
+    assert [len(batch) for batch in batches] == [300, 300, 300, 100]
+
+    profiles = [profile for batch in batches for profile in batch]
+    faker_profile = generate_fake_profile()
+    for profile in profiles:
+        assert profile.keys() == faker_profile.keys()
+        assert all(type(profile[column]) is type(faker_profile[column]) for column in profile)
+        assert MIN_AGE <= profile["age"] <= MAX_AGE
+        user_name, domain = profile["email"].split("@")
+        assert user_name.isalnum() and user_name.islower()
+        assert domain in profile_generator.email_domains
+
+    # Names are drawn from Faker's pools with their weights
+    first_names = {profile["first_name"] for profile in profiles}
+    assert first_names <= set(profile_generator.first_names)
+    assert len(first_names) > len(profiles) // 10
+
+
+@pytest.mark.django_db
+def test_numeric_average_matches_postgresql() -> None:
+    sums_and_counts = [(0, 1), (1, 3), (2, 3), (9999, 10000), (10000, 9999), (-5, 3), (123_456_789, 1)]
+    sums_and_counts += [(random.randint(0, 10**12), random.randint(1, 10**8)) for _ in range(100)]
+    with connection.cursor() as cursor:
+        for total, count in sums_and_counts:
+            cursor.execute("SELECT %s::numeric / %s::numeric", [total, count])
+            # Same digits and scale as the numeric returned by PostgreSQL
+            assert str(numeric_average(total, count)) == str(cursor.fetchone()[0]), f"{total=} | {count=}"
@@ -1,11 +1,27 @@
+import hashlib
 import json
+import string
 import time
-from typing import Any
+from decimal import Decimal
+from typing import Any, Iterable, Iterator
 
+import numpy as np
 from faker import Faker
 
 fake = Faker()
 
+PROFILE_GENERATORS = ["faker", "numpy"]
+DEFAULT_PROFILE_GENERATOR = "faker"
+MIN_AGE = 18
+MAX_AGE = 90
+# PostgreSQL numerics are stored as base 10000 digits, of 4 decimal digits each
+NUMERIC_DIGIT_BASE = 10_000
+NUMERIC_DIGIT_DECIMALS = 4
+NUMERIC_MIN_SIG_DIGITS = 16
+# Inputs filter on the first 2 to 4 input columns, the prefixes of the keys of the filters and summaries
+MIN_KEY_COLUMNS = 2
+KEY_SEPARATOR = "\x1f"
+
 
 def timeit(func):
     def wrapper(*args, **kwargs):
@@ -23,7 +39,7 @@ def generate_fake_profile(columns: list[str] | None = None) -> dict[str, Any]:
     profile = {
         "first_name": fake.first_name(),
         "last_name": fake.last_name(),
-        "age": fake.random_int(min=18, max=90),
+        "age": fake.random_int(min=MIN_AGE, max=MAX_AGE),
         "email": fake.email(),
     }
     if columns:
@@ -32,11 +48,145 @@ def generate_fake_profile(columns: list[str] | None = None) -> dict[str, Any]:
     return profile
 
 
-def generate_random_inputs(number_of_inputs: int, columns: list[str]) -> list[tuple]:
+def generate_random_inputs(
+    number_of_inputs: int, columns: list[str], profile_generator: "FakeProfileGenerator | None" = None
+) -> list[tuple]:
+    if profile_generator:
+        return list(zip(*profile_generator.generate_columns(number_of_inputs, columns).values(), strict=True))
+
     full_profiles = [generate_fake_profile(columns) for _ in range(number_of_inputs)]
     return [tuple(full_profile[column] for column in columns) for full_profile in full_profiles]
 
 
+def iter_fake_profiles(
+    number_of_profiles: int,
+    batch_size: int,
+    generator: str = DEFAULT_PROFILE_GENERATOR,
+    seed: int | None = None,
+) -> Iterator[list[dict[str, Any]]]:
+    """Yield batches of at most batch_size fake profiles, generated with Faker or with NumPy."""
+    if generator not in PROFILE_GENERATORS:
+        raise ValueError(f"Unknown profile generator: {generator}. Available generators: {PROFILE_GENERATORS}")
+
+    if generator == "numpy":
+        yield from FakeProfileGenerator(seed, batch_size).iter_profiles(number_of_profiles)
+        return
+
+    if seed is not None:
+        fake.seed_instance(seed)
+    while number_of_profiles > 0:
+        batch_size = min(number_of_profiles, batch_size)
+        yield [generate_fake_profile() for _ in range(batch_size)]
+        number_of_profiles -= batch_size
+
+
+class FakeProfileGenerator:
+    """Vectorized equivalent of generate_fake_profile.
+
+    Whole columns are drawn at once with NumPy from the same weighted name pools used by Faker,
+    and emails follow Faker's user_name formats with its safe domain names.
+    """
+
+    def __init__(self, seed: int | None = None, batch_size: int = 10_000) -> None:
+        self.rng = np.random.default_rng(seed)
+        self.batch_size = batch_size
+
+        person_provider = fake.provider("faker.providers.person")
+        self.first_names, self.first_name_weights = self._weighted_pool(person_provider.first_names)
+        self.last_names, self.last_name_weights = self._weighted_pool(person_provider.last_names)
+        self.email_domains = np.array(fake.provider("faker.providers.internet").safe_domain_names)
+
+    @staticmethod
+    def _weighted_pool(elements: dict[str, float] | list[str]) -> tuple[np.ndarray, np.ndarray | None]:
+        if isinstance(elements, dict):
+            weights = np.array(list(elements.values()), dtype=float)
+            return np.array(list(elements.keys())), weights / weights.sum()
+
+        return np.array(elements), None
+
+    def _choice(self, pool: np.ndarray, weights: np.ndarray | None, size: int) -> np.ndarray:
+        return pool[self.rng.choice(len(pool), size=size, p=weights)]
+
+    def _user_names(self, size: int) -> np.ndarray:
+        """Vectorized Faker user_name(): one of the 4 en_US formats, lowercased."""
+        first_names = np.char.lower(self._choice(self.first_names, self.first_name_weights, size))
+        last_names = np.char.lower(self._choice(self.last_names, self.last_name_weights, size))
+        digits = np.char.zfill(self.rng.integers(0, 100, size=size).astype(str), 2)
+        letters = np.array(list(string.ascii_lowercase))[self.rng.integers(0, len(string.ascii_lowercase), size=size)]
+        # Faker removes the dots of the formats when slugifying the user name
+        user_name_formats = [
+            np.char.add(last_names, first_names),  # {{last_name}}.{{first_name}}
+            np.char.add(first_names, last_names),  # {{first_name}}.{{last_name}}
+            np.char.add(first_names, digits),  # {{first_name}}##
+            np.char.add(letters, last_names),  # ?{{last_name}}
+        ]
+        return np.choose(self.rng.integers(0, len(user_name_formats), size=size), user_name_formats)
+
+    def generate_columns(self, number_of_profiles: int, columns: list[str] | None = None) -> dict[str, list]:
+        """Generate the profiles column by column, as plain Python values ready for the database."""
+        columns = columns or ["first_name", "last_name", "age", "email"]
+        generators = {
+            "first_name": lambda size: self._choice(self.first_names, self.first_name_weights, size),
+            "last_name": lambda size: self._choice(self.last_names, self.last_name_weights, size),
+            "age": lambda size: self.rng.integers(MIN_AGE, MAX_AGE + 1, size=size),
+            "email": lambda size: np.char.add(
+                np.char.add(self._user_names(size), "@"), self._choice(self.email_domains, None, size)
+            ),
+        }
+        return {column: generators[column](number_of_profiles).tolist() for column in columns}
+
+    def generate_profiles(self, number_of_profiles: int, columns: list[str] | None = None) -> list[dict[str, Any]]:
+        profile_columns = self.generate_columns(number_of_profiles, columns)
+        return [
+            dict(zip(profile_columns, values, strict=True)) for values in zip(*profile_columns.values(), strict=True)
+        ]
+
+    def iter_profiles(self, number_of_profiles: int) -> Iterator[list[dict[str, Any]]]:
+        """Yield batches of at most batch_size profiles until number_of_profiles are generated."""
+        while number_of_profiles > 0:
+            batch_size = min(number_of_profiles, self.batch_size)
+            yield self.generate_profiles(batch_size)
+            number_of_profiles -= batch_size
+
+
+def numeric_average(total: int, count: int) -> Decimal:
+    """Divide a sum by a count of integers exactly as PostgreSQL computes AVG of an integer column.
+
+    The quotient is rounded half away from zero at the scale chosen by select_div_scale() in numeric.c:
+    at least 16 significant digits, from the weights of the first base 10000 digits of the operands.
+    """
+
+    def weight_and_first_digit(value: int) -> tuple[int, int]:
+        weight, value = 0, abs(value)
+        while value >= NUMERIC_DIGIT_BASE:
+            value //= NUMERIC_DIGIT_BASE
+            weight += 1
+        return weight, value
+
+    total_weight, total_first_digit = weight_and_first_digit(total)
+    count_weight, count_first_digit = weight_and_first_digit(count)
+    quotient_weight = total_weight - count_weight - (1 if total_first_digit <= count_first_digit else 0)
+    scale = max(NUMERIC_MIN_SIG_DIGITS - quotient_weight * NUMERIC_DIGIT_DECIMALS, 0)
+    quotient, remainder = divmod(abs(total) * 10**scale, count)
+    if 2 * remainder >= count:
+        quotient += 1
+
+    sign = "-" if total < 0 else ""
+    return Decimal(f"{sign}{quotient}e-{scale}")
+
+
+def key_column_prefixes(key_columns: list[str]) -> list[list[str]]:
+    """Prefixes of the key columns filtered by the experiments, from MIN_KEY_COLUMNS columns."""
+    return [key_columns[:number_of_columns] for number_of_columns in range(MIN_KEY_COLUMNS, len(key_columns) + 1)]
+
+
+def key_digests(keys: Iterable[tuple], digest_size: int) -> bytes:
+    """Concatenated BLAKE2b digests of the key tuples, of digest_size bytes each."""
+    return b"".join(
+        hashlib.blake2b(KEY_SEPARATOR.join(map(str, key)).encode(), digest_size=digest_size).digest() for key in keys
+    )
+
+
 def save_query(query_str: str, filename: str = "query.sql"):
     with open(filename, "w") as f:
         f.write(str(query_str))
@@ -1,6 +1,7 @@
 import json
 
 import matplotlib.pyplot as plt
+from matplotlib.container import BarContainer
 
 BAR_SIZE = 0.3
 
@@ -13,13 +14,31 @@ def plot_graph(filename: str) -> str:
     experiments = [k for k in experiments_data.keys() if k.startswith("Experiment")]
     methods = sorted(experiments_data[experiments[0]].keys())
     runtime_by_method = {method: [experiments_data[exp][method] for exp in experiments] for method in methods}
+    # Error bars from the confidence interval of the mean, when the samples statistics are available
+    statistics = experiments_data.get("statistics", {})
+    error_by_method = {
+        method: [
+            [experiments_data[exp][method] - statistics[exp][method]["ci_low"] for exp in experiments],
+            [statistics[exp][method]["ci_high"] - experiments_data[exp][method] for exp in experiments],
+        ]
+        if statistics
+        else None
+        for method in methods
+    }
 
     y = range(len(experiments))
-    height = BAR_SIZE
+    height = min(BAR_SIZE, 0.9 / len(methods))
 
     _, ax = plt.subplots()
     for i, method in enumerate(methods):
-        ax.barh([j - height / 2 + i * height for j in y], runtime_by_method[method], height, label=method)
+        ax.barh(
+            [j - height / 2 + i * height for j in y],
+            runtime_by_method[method],
+            height,
+            label=method,
+            xerr=error_by_method[method],
+            capsize=2,
+        )
 
     ax.set_yticks(y)
     ax.set_yticklabels([exp.replace("Experiment", "") for exp in experiments])
@@ -35,6 +54,8 @@ def plot_graph(filename: str) -> str:
     # Add value labels to bars
     max_width = 0
     for container in ax.containers:
+        if not isinstance(container, BarContainer):
+            continue
         for bar in container:
             width = bar.get_width()
             height = bar.get_y() + bar.get_height() / 2
@@ -42,7 +63,7 @@ def plot_graph(filename: str) -> str:
             ax.text(width, height, f"{width:.2f}", ha="left", va="center")
 
     # Add padding to the x-axis so text fits
-    ax.set_xlim(right=max_width * 1.10)  # 10% padding
+    ax.set_xlim(right=max(max_width * 1.10, ax.get_xlim()[1]))  # 10% padding, or up to the error bars
 
     output_filename = f"plot_{filename.replace('.json', '')}.png"
     plt.savefig(output_filename)